@@ -1,13 +1,22 @@
 import math
 import logging
 import time
+from array import array
+from bisect import bisect_left, insort
 from collections import defaultdict, Counter
 from data import (
     get_teacher, get_subject, get_student,
     get_subject_teacher, get_subject_student, get_hour_blocker
 )
-import copy
+import csv
+import os
 import random
+import struct
+import zlib
+import multiprocessing
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import json  # For reading subject–student mappings
 
 # --- Logging setup ---
@@ -20,10 +29,41 @@ logger = logging.getLogger(__name__)
 # --- Constants ---
 PERIODS_PER_DAY = 10
 DAYS = ["monday", "tuesday", "wednesday", "thursday"]
-STALL_THRESHOLD = 10000       # Stop if no improvement for 10,000 iterations
+SLOTS_PER_WEEK = len(DAYS) * PERIODS_PER_DAY
+SLOT_COORDS = tuple(divmod(i, PERIODS_PER_DAY) for i in range(SLOTS_PER_WEEK))  # slot -> (day, period)
+STALL_THRESHOLD = 10000       # Reheat from the best schedule after 10,000 iterations without improvement
 LOG_INTERVAL = 1000           # Log status every 1,000 iterations
+SA_CALIBRATION_MOVES = 200    # Sampled moves used to pick the starting temperature
+SA_INITIAL_ACCEPTANCE = 0.5   # Acceptance probability of an average uphill move at the start
+SA_FINAL_TEMP_RATIO = 0.001   # Final temperature as a fraction of the starting one
+SA_REHEAT_RATIO = 0.5         # Starting temperature scale applied on each reheat
+SA_FROZEN_ACCEPTANCE = 0.01   # Uphill acceptance rate below which a stalled chain counts as frozen
+SA_WARM_TEMP_RATIO = 0.01     # Starting temperature of a warm-started chain, as a fraction of the calibrated one
+PT_REPLICAS = 4               # Default replica count for parallel tempering
+PT_MIN_TEMP_RATIO = 0.001    # Coldest replica temperature as a fraction of the calibrated (hottest) one
+PT_SWEEP_STEPS = 500          # Moves per replica between exchange attempts
+TABU_TENURE = 15              # Steps a vacated (session, start) stays forbidden
+TABU_SAMPLE_SIZE = 30         # Neighbours sampled per tabu step
+TABU_STALL_STEPS = 1000       # Stop tabu search after this many steps without improvement
+LNS_MIN_FRACTION = 0.05       # Bounds on the share of placed sessions destroyed per LNS round
+LNS_MAX_FRACTION = 0.4
+LNS_STALL_ROUNDS = 2000       # Stop LNS after this many rounds without improvement
+CLIQUE_SEARCH_BUDGET = 200000 # Max clique-search calls in the feasibility analysis
+WARM_START_TIME_LIMIT = 60    # Search budget (s) when starting from a saved schedule
+REPAIR_DISPLACEMENT_RATIO = 2 # Repair cost of moving a lesson, in multiples of the largest sampled move delta
+REPAIR_STALL_STEPS = 5000     # Stop the repair search after this many steps without improvement
+CHECKPOINT_INTERVAL = 30      # Seconds between solver checkpoints
+OPERATOR_SEGMENT = 200        # Proposals between operator reweightings
+OPERATOR_REACTION = 0.3       # How fast operator weights follow their recent reward rate
+OPERATOR_MIN_WEIGHT = 0.05    # Floor so that no operator is starved completely
+OPERATOR_ACCEPT_REWARD = 0.1  # Reward of an accepted non-improving move (an improvement scores 1)
+OPERATOR_TIME_BUCKETS = 16    # Proposal-time histogram buckets: bucket b counts times under 2**b µs
 
 # --- Helper Functions ---
+def popcount(x):
+    """Number of set bits in the int bitset `x` (int.bit_count needs Python 3.10)."""
+    return bin(x).count('1')
+
 def group_students_by_subjects(subj_students):
     """Group students who have exactly the same set of subjects."""
     student_subjects = defaultdict(set)
@@ -49,6 +89,38 @@ def group_students_by_subjects(subj_students):
 
     return grouped_subj_students, student_to_group
 
+def cohort_weights(student_groups):
+    """Map each cohort representative to the number of students it stands for."""
+    weights = defaultdict(int)
+    for rep in student_groups.values():
+        weights[rep] += 1
+    return dict(weights)
+
+def cohort_members(student_groups):
+    """Map each cohort representative to the students it stands for."""
+    members = defaultdict(list)
+    for student, rep in sorted(student_groups.items()):
+        members[rep].append(student)
+    return dict(members)
+
+def split_students(students, n_groups, student_weights=None):
+    """
+    Split sorted `students` into `n_groups` consecutive groups of roughly
+    equal size, counting each cohort representative by its weight.
+    Trailing groups may be empty.
+    """
+    weights = student_weights or {}
+    total = sum(weights.get(st, 1) for st in students)
+    size = math.ceil(total / n_groups)
+    groups = [[] for _ in range(n_groups)]
+    grp, filled = 0, 0
+    for st in students:
+        if filled >= size and grp < n_groups - 1:
+            grp, filled = grp + 1, 0
+        groups[grp].append(st)
+        filled += weights.get(st, 1)
+    return groups
+
 # --- Data Loading ---
 def load_data():
     teachers = {t[0]: t for t in get_teacher()}
@@ -146,13 +218,77 @@ def validate_input_data(teachers, subjects, subject_teachers, subj_students):
     return True
 
 # --- Session Creation ---
-def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blocker):
+class Session:
+    """
+    One lesson to place: a single hour, or a block of `block_size` hours.
+    `teachers` is a tuple of teacher ids, `students` a tuple shared by all
+    sessions of the same (subject, group), and `candidates` an array('b')
+    of the start slots (day * PERIODS_PER_DAY + period) it fits. `index`
+    and `student_conflicts` are set by index_sessions. Sessions compare by
+    identity; to_dict() gives the plain JSON view.
+    """
+    __slots__ = ('id', 'subject', 'group', 'teachers', 'students', 'candidates',
+                 'max_per_day', 'min_per_day', 'block_size', 'hour', 'parallel_with',
+                 'is_parallel', 'teacher_shared_with', 'index', 'student_conflicts')
+
+    def __init__(self, id, subject, teachers, students, candidates, max_per_day, min_per_day,
+                 block_size=1, group=1, hour=None, parallel_with=None, is_parallel=False):
+        self.id = id
+        self.subject = subject
+        self.group = group
+        self.teachers = tuple(teachers)
+        self.students = students if isinstance(students, tuple) else tuple(students)
+        self.candidates = candidates
+        self.max_per_day = max_per_day
+        self.min_per_day = min_per_day
+        self.block_size = block_size
+        self.hour = hour
+        self.parallel_with = parallel_with
+        self.is_parallel = is_parallel
+        self.teacher_shared_with = None
+        self.index = -1
+        self.student_conflicts = 0
+
+    def __repr__(self):
+        return f"Session({self.id!r}, subject={self.subject}, group={self.group})"
+
+    def copy(self, **changes):
+        """Shallow copy with `changes` applied; the tuples and candidates are shared."""
+        clone = Session.__new__(Session)
+        for name in Session.__slots__:
+            setattr(clone, name, getattr(self, name))
+        for name, value in changes.items():
+            setattr(clone, name, value)
+        return clone
+
+    def to_dict(self):
+        """The session as JSON-ready dict (without the solver's conflict bitset)."""
+        return {
+            'id': self.id,
+            'subject': self.subject,
+            'group': self.group,
+            'teachers': list(self.teachers),
+            'students': list(self.students),
+            'candidates': self.candidates.tolist(),
+            'max_per_day': self.max_per_day,
+            'min_per_day': self.min_per_day,
+            'block_size': self.block_size,
+            'hour': self.hour,
+            'parallel_with': self.parallel_with,
+            'is_parallel': self.is_parallel,
+            'teacher_shared_with': list(self.teacher_shared_with or ()),
+            'index': self.index,
+        }
+
+def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blocker, student_groups=None):
     """
     Build sessions for all subjects.
       - Parallel subjects (subj[7] == 1) produce `hours_per_week` combined sessions
         requiring ALL assigned teachers at once (no student grouping yet).
       - Non-parallel subjects split into student groups up front as before.
-    Each parallel session is tagged with 'parallel_with' = subject_id for later splitting.
+    Each parallel session is tagged with parallel_with = subject_id for later splitting.
+    Session students are cohort representatives; pass `student_groups` from
+    load_data so groups are balanced by cohort size.
     """
     # 1) validate inputs
     if not validate_input_data(teachers, subjects, subject_teachers, subj_students):
@@ -167,6 +303,7 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
         grp = max(1, st[7])
         subject_teacher_groups[sid].append((tid, grp))
 
+    student_weights = cohort_weights(student_groups) if student_groups else None
     sessions = []
 
     # 3) build sessions
@@ -177,7 +314,7 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
         if minpd > maxpd:
             minpd = maxpd
 
-        all_students   = sorted(subj_students.get(sid, []))
+        all_students   = tuple(sorted(subj_students.get(sid, [])))
         teacher_groups = subject_teacher_groups.get(sid, [])
         if not teacher_groups:
             logger.error(f"No teacher assigned for Subject {sid}")
@@ -207,11 +344,7 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
 
         # --- NON-PARALLEL SUBJECTS ---
         n_groups = subj[2]
-        size = math.ceil(len(all_students) / n_groups)
-        student_groups = [
-            all_students[i*size:(i+1)*size]
-            for i in range(n_groups)
-        ]
+        group_students = [tuple(studs) for studs in split_students(all_students, n_groups, student_weights)]
         
         # Check if there are fewer teachers than groups for non-parallel subjects
         fewer_teachers = len(flat_teachers) < n_groups
@@ -222,7 +355,7 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
         teacher_groups_map = defaultdict(list)  # {teacher_id: [group_indices]}
         
         # Assign teachers to groups evenly
-        for grp_idx, studs in enumerate(student_groups):
+        for grp_idx, studs in enumerate(group_students):
             if not studs:
                 continue
                 
@@ -237,7 +370,7 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
             teacher_groups_map[tid].append(grp_idx)
 
         # Now create sessions for each group with their assigned teacher
-        for grp_idx, studs in enumerate(student_groups):
+        for grp_idx, studs in enumerate(group_students):
             if not studs:
                 continue
                 
@@ -271,11 +404,11 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
                         subjects_dict=subjects,
                         parallel_group=None
                     )
-                    blk['group'] = grp_idx + 1
+                    blk.group = grp_idx + 1
                     
                     # Mark which other groups share this teacher to prevent conflicts
                     if len(teacher_conflict_groups) > 1:
-                        blk['teacher_shared_with'] = teacher_conflict_groups
+                        blk.teacher_shared_with = tuple(teacher_conflict_groups)
                         
                     sessions.append(blk)
 
@@ -293,11 +426,11 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
                         subjects_dict=subjects,
                         parallel_group=None
                     )
-                    single['group'] = grp_idx + 1
+                    single.group = grp_idx + 1
                     
                     # Mark which other groups share this teacher to prevent conflicts
                     if len(teacher_conflict_groups) > 1:
-                        single['teacher_shared_with'] = teacher_conflict_groups
+                        single.teacher_shared_with = tuple(teacher_conflict_groups)
                         
                     sessions.append(single)
 
@@ -316,22 +449,44 @@ def build_sessions(teachers, subjects, subject_teachers, subj_students, hour_blo
                         subjects_dict=subjects,
                         parallel_group=None
                     )
-                    sess['group'] = grp_idx + 1
+                    sess.group = grp_idx + 1
                     
                     # Mark which other groups share this teacher to prevent conflicts
                     if len(teacher_conflict_groups) > 1:
-                        sess['teacher_shared_with'] = teacher_conflict_groups
+                        sess.teacher_shared_with = tuple(teacher_conflict_groups)
                         
                     sessions.append(sess)
 
+    return index_sessions(sessions)
+
+def index_sessions(sessions):
+    """
+    Number the sessions 0..n-1 in `index`. Session ids are not unique across
+    groups, so the solver keys its per-session state on this index instead.
+    Also stores the session x session "shares a student" matrix, one int
+    bitset per session in `student_conflicts` (bit j set when session j has
+    a student in common with it, itself included). Memberships never change
+    during a solve, so this is computed once.
+    """
+    by_student = defaultdict(int)
+    for i, sess in enumerate(sessions):
+        sess.index = i
+        for st in sess.students:
+            by_student[st] |= 1 << i
+    for sess in sessions:
+        mask = 0
+        for st in sess.students:
+            mask |= by_student[st]
+        sess.student_conflicts = mask
     return sessions
 
-def split_parallel_sessions(schedule, subjects, subj_students):
+def split_parallel_sessions(schedule, subjects, subj_students, student_weights=None):
     """
     After scheduling, expand each parallel session into its
     subj[2] student-groups—keeping them all in the same timeslot.
     When teacher count < group count, ensure proper teacher distribution
     and track which groups can't be scheduled in the same hour.
+    Students are cohort representatives, split by cohort size.
     """
     result = {}
     
@@ -344,19 +499,19 @@ def split_parallel_sessions(schedule, subjects, subj_students):
         
         # First add all non-parallel sessions to the result and track their teachers
         for sess in slot_sessions:
-            if 'parallel_with' not in sess:
+            if sess.parallel_with is None:
                 result_slot.append(sess)
-                for tid in sess['teachers']:
+                for tid in sess.teachers:
                     teachers_in_slot.add(tid)
         
         # Now process parallel sessions
-        parallel_sessions = [sess for sess in slot_sessions if 'parallel_with' in sess]
+        parallel_sessions = [sess for sess in slot_sessions if sess.parallel_with is not None]
         
         # Sort by subject to ensure consistent processing
-        parallel_sessions.sort(key=lambda s: s['subject'])
+        parallel_sessions.sort(key=lambda s: s.subject)
         
         for sess in parallel_sessions:
-            sid = sess['subject']
+            sid = sess.subject
             subj = subjects[sid]
             n_groups = subj[2]
             all_students = sorted(subj_students.get(sid, []))
@@ -365,20 +520,14 @@ def split_parallel_sessions(schedule, subjects, subj_students):
             if not all_students:
                 continue
                 
-            # Calculate group size and split students
-            size = max(1, math.ceil(len(all_students) / n_groups))
-            student_groups = []
-            for i in range(n_groups):
-                start_idx = i * size
-                end_idx = min(start_idx + size, len(all_students))
-                if start_idx < len(all_students):
-                    student_groups.append(all_students[start_idx:end_idx])
+            # Split students into groups of similar size
+            student_groups = [g for g in split_students(all_students, n_groups, student_weights) if g]
             
             # Create a pool of available teachers for this subject
-            available_teachers = [t for t in sess['teachers'] if t not in teachers_in_slot]
+            available_teachers = [t for t in sess.teachers if t not in teachers_in_slot]
             
             # If we have more groups than available teachers, we need to reschedule
-            if len(student_groups) > (len(available_teachers) + len(sess['teachers']) - len(available_teachers)):
+            if len(student_groups) > (len(available_teachers) + len(sess.teachers) - len(available_teachers)):
                 logger.warning(f"Not enough teachers for all groups in subject {sid} at {slot}. Some groups will need rescheduling.")
             
             # Create split sessions for each group
@@ -386,26 +535,20 @@ def split_parallel_sessions(schedule, subjects, subj_students):
                 if not students:
                     continue
                     
-                # Create a copy of the session for this group
-                split_sess = copy.deepcopy(sess)
-                split_sess['students'] = students
-                split_sess['group'] = grp_idx
-                
-                # Remove parallel_with marker
-                if 'parallel_with' in split_sess:
-                    del split_sess['parallel_with']
+                # Create a copy of the session for this group, without the parallel_with marker
+                split_sess = sess.copy(students=tuple(students), group=grp_idx, parallel_with=None)
                 
                 # Assign a teacher if available
                 if available_teachers:
                     assigned_tid = available_teachers.pop(0)
-                    split_sess['teachers'] = [assigned_tid]
+                    split_sess.teachers = (assigned_tid,)
                     teachers_in_slot.add(assigned_tid)
                 else:
                     # We need to force this group to be scheduled in a different timeslot
                     # by creating an impossible conflict
-                    if sess['teachers']:
-                        assigned_tid = random.choice(sess['teachers'])
-                        split_sess['teachers'] = [assigned_tid]
+                    if sess.teachers:
+                        assigned_tid = random.choice(sess.teachers)
+                        split_sess.teachers = (assigned_tid,)
                         # We do NOT add to teachers_in_slot to ensure this conflict is detected
                 
                 result_slot.append(split_sess)
@@ -416,113 +559,102 @@ def split_parallel_sessions(schedule, subjects, subj_students):
     for slot, sessions in result.items():
         teachers_used = {}
         for sess in sessions:
-            for tid in sess['teachers']:
+            for tid in sess.teachers:
                 if tid in teachers_used:
                     logger.error(f"Teacher {tid} assigned to multiple sessions at {slot}")
-                teachers_used[tid] = sess['id']
+                teachers_used[tid] = sess.id
     
     return result
 
+# Slot masks: bit (day * PERIODS_PER_DAY + period) is set when that slot is usable
+@lru_cache(maxsize=None)
+def teacher_slot_mask(teacher):
+    """Slots inside the teacher's working days and hour windows (teacher row from get_teacher)."""
+    mask = 0
+    for di in range(len(DAYS)):
+        if teacher[4 + di]:
+            start, end = teacher[8 + di], teacher[12 + di]  # 1-based, inclusive
+            for p in range(max(start - 1, 0), min(end, PERIODS_PER_DAY)):
+                mask |= 1 << (di * PERIODS_PER_DAY + p)
+    return mask
+
+def hour_blocker_mask(hour_blocker):
+    """Slots left open by the global hour blocker."""
+    return sum(1 << (di * PERIODS_PER_DAY + p)
+               for di, day in enumerate(DAYS) for p in range(PERIODS_PER_DAY) if hour_blocker[day][p] == 1)
+
+@lru_cache(maxsize=None)
+def _candidate_starts(teacher_rows, block_size, open_mask):
+    mask = open_mask
+    for row in teacher_rows:
+        mask &= teacher_slot_mask(row)
+    # A block may start at s if slots s .. s+block_size-1 are all open and on the same day
+    starts = mask
+    for off in range(1, block_size):
+        starts &= mask >> off
+    day_starts = sum(1 << (di * PERIODS_PER_DAY + p)
+                     for di in range(len(DAYS)) for p in range(PERIODS_PER_DAY - block_size + 1))
+    starts &= day_starts
+    return tuple(sl for sl in range(SLOTS_PER_WEEK) if starts >> sl & 1)
+
+def candidate_starts(teachers_list, block_size, teachers_dict, hour_blocker):
+    """
+    Start slots where a block of `block_size` hours fits every teacher's
+    days and windows and the hour blocker, as an array('b') of slots.
+    Memoized by the teachers' rows (so edited availability is never served
+    stale) and block size.
+    """
+    rows = tuple(teachers_dict[tid] for tid in sorted(set(teachers_list)))
+    return array('b', _candidate_starts(rows, block_size, hour_blocker_mask(hour_blocker)))
+
 def create_single_session(sid, teachers_list, hour, students, teachers_dict,
                           maxpd, minpd, hour_blocker, subjects_dict,
                           parallel_group=None):
-    session = {
-        'id': f"S{sid}_H{hour}",
-        'subject': sid,
-        'teachers': teachers_list,
-        'group': 1,
-        'students': students,
-        'candidates': [],
-        'max_per_day': maxpd,
-        'min_per_day': minpd,
-        'block_size': 1,
-        'hour': hour
-    }
-    
-    # Add parallel_with marker if this is a parallel session
-    if parallel_group is not None:
-        session['parallel_with'] = parallel_group
-
-    for di, day in enumerate(DAYS):
-        # must be available that day
-        if not all(teachers_dict[tid][4 + di] for tid in teachers_list):
-            continue
-
-        # each teacher's allowed window on that day:
-        # start = teachers_dict[tid][8+di], end = teachers_dict[tid][12+di]
-        for p in range(PERIODS_PER_DAY):
-            if hour_blocker[day][p] != 1:
-                continue
-
-            ok = True
-            for tid in teachers_list:
-                start, end = teachers_dict[tid][8 + di], teachers_dict[tid][12 + di]
-                # p is zero‐based, hours are 1‐based:
-                if not (start - 1 <= p <= end - 1):
-                    ok = False
-                    break
-            if not ok:
-                continue
-
-            session['candidates'].append(di * PERIODS_PER_DAY + p)
+    session = Session(
+        id=f"S{sid}_H{hour}",
+        subject=sid,
+        teachers=teachers_list,
+        students=students,
+        candidates=candidate_starts(teachers_list, 1, teachers_dict, hour_blocker),
+        max_per_day=maxpd,
+        min_per_day=minpd,
+        hour=hour,
+        parallel_with=parallel_group
+    )
 
-    if not session['candidates']:
-        logger.error(f"Session {session['id']} (Subject {sid}) has NO CANDIDATES.")
+    if not session.candidates:
+        logger.error(f"Session {session.id} (Subject {sid}) has NO CANDIDATES.")
     return session
 
 
 def create_block_session(sid, teachers_list, students, teachers_dict,
                          block_size, hour_blocker, subjects_dict,
                          parallel_group=None):
-    session = {
-        'id': f"S{sid}_B{block_size}_{random.randint(0,1_000_000)}",
-        'subject': sid,
-        'teachers': teachers_list,
-        'group': 1,
-        'students': students,
-        'candidates': [],
-        'max_per_day': subjects_dict[sid][4],
-        'min_per_day': block_size,
-        'parallel_with': parallel_group,
-        'is_parallel': (parallel_group is not None),
-        'block_size': block_size
-    }
-
-    for di, day in enumerate(DAYS):
-        if not all(teachers_dict[tid][4 + di] for tid in teachers_list):
-            continue
-
-        # each teacher's allowed window on that day
-        starts = [teachers_dict[tid][8 + di] - 1 for tid in teachers_list]
-        ends   = [teachers_dict[tid][12 + di] - 1 for tid in teachers_list]
-
-        for p in range(PERIODS_PER_DAY - block_size + 1):
-            can_place = True
-            for offset in range(block_size):
-                idx = p + offset
-                # global blocker
-                if hour_blocker[day][idx] != 1:
-                    can_place = False
-                    break
-
-                # window check
-                if any(idx < s or idx > e for s, e in zip(starts, ends)):
-                    can_place = False
-                    break
-
-            if can_place:
-                session['candidates'].append(di * PERIODS_PER_DAY + p)
+    session = Session(
+        id=f"S{sid}_B{block_size}_{random.randint(0,1_000_000)}",
+        subject=sid,
+        teachers=teachers_list,
+        students=students,
+        candidates=candidate_starts(teachers_list, block_size, teachers_dict, hour_blocker),
+        max_per_day=subjects_dict[sid][4],
+        min_per_day=block_size,
+        block_size=block_size,
+        parallel_with=parallel_group,
+        is_parallel=(parallel_group is not None)
+    )
 
-    if not session['candidates']:
-        logger.error(f"Block session {session['id']} (Subject {sid}, size={block_size}) has NO CANDIDATES.")
+    if not session.candidates:
+        logger.error(f"Block session {session.id} (Subject {sid}, size={block_size}) has NO CANDIDATES.")
     return session
 
-def evaluate_schedule(schedule, all_sessions, subjects):
+def evaluate_schedule(schedule, all_sessions, subjects, student_weights=None):
     """
     Compute a numeric score of `schedule`. Lower is better.
     Treats each (subject, group) separately for minpd/maxpd/weekly totals.
+    Student penalties are multiplied by the cohort size in `student_weights`.
     **Returns float('inf') immediately if any teacher or student conflict exists.**
     """
+    weights = student_weights or {}
     IDLE_PENALTY = 5000
 
     # CRITICAL CHECK: Detect teachers assigned to multiple sessions at the same time
@@ -530,12 +662,12 @@ def evaluate_schedule(schedule, all_sessions, subjects):
     
     for (day, period), sessions_here in schedule.items():
         for sess in sessions_here:
-            for tid in sess['teachers']:
+            for tid in sess.teachers:
                 key = (tid, day, period)
                 if key in teacher_timeslots:
                     # Teacher already has a session at this time - IMMEDIATE REJECTION
                     return float('inf')
-                teacher_timeslots[key] = sess['id']
+                teacher_timeslots[key] = sess.id
 
     score = 0
     teacher_conflicts = 0
@@ -550,21 +682,20 @@ def evaluate_schedule(schedule, all_sessions, subjects):
     # 1) Tally and detect conflicts
     for (day, period), sessions_here in schedule.items():
         for sess in sessions_here:
-            sid, grp = sess['subject'], sess['group']
-            blk = sess.get('block_size', 1)
+            sid, grp = sess.subject, sess.group
 
-            # accumulate for min/max checks later
-            scheduled_count[sid][grp] += blk
-            subject_daily_hours[sid][grp][day] += blk
+            # accumulate for min/max checks later (one hour per occupied slot)
+            scheduled_count[sid][grp] += 1
+            subject_daily_hours[sid][grp][day] += 1
 
             # detect student conflict
-            for st in sess['students']:
+            for st in sess.students:
                 if period in student_schedule[st][day]:
                     student_conflicts += 1
                 student_schedule[st][day].append(period)
 
             # detect teacher conflict
-            for tid in sess['teachers']:
+            for tid in sess.teachers:
                 if period in teacher_slots[tid][day]:
                     teacher_conflicts += 1
                 teacher_slots[tid][day].add(period)
@@ -600,7 +731,7 @@ def evaluate_schedule(schedule, all_sessions, subjects):
                     periods = sorted(
                         p for (dd, p), sl in schedule.items()
                         if dd == d for s in sl
-                        if s['subject'] == sid and s['group'] == grp
+                        if s.subject == sid and s.group == grp
                     )
                     for i in range(len(periods)-1):
                         if periods[i+1] - periods[i] != 1:
@@ -612,14 +743,16 @@ def evaluate_schedule(schedule, all_sessions, subjects):
 
     # 4) Student daily‐load penalties
     for st, daily in student_daily_hours.items():
+        w = weights.get(st, 1)
         for d, h in daily.items():
             if h < 4:
-                score += 2000 * (4 - h)
+                score += w * 2000 * (4 - h)
             elif h > 6:
-                score += 3000 * (h - 6)
+                score += w * 3000 * (h - 6)
 
     # 5) Idle‐time gaps
     for st, days in student_schedule.items():
+        w = weights.get(st, 1)
         for d, ps in days.items():
             if len(ps) < 2:
                 continue
@@ -627,68 +760,456 @@ def evaluate_schedule(schedule, all_sessions, subjects):
             for i in range(len(ps_sorted)-1):
                 gap = ps_sorted[i+1] - ps_sorted[i] - 1
                 if gap > 0:
-                    score += IDLE_PENALTY * gap
+                    score += w * IDLE_PENALTY * gap
 
     return score
 
+# --- Feasibility Analysis ---
+def session_coverage(sess):
+    """Bitmask of the week slots `sess` can occupy from any of its candidate starts."""
+    run = (1 << sess.block_size) - 1
+    mask = 0
+    for sl in sess.candidates:
+        mask |= run << sl
+    return mask
+
+def max_weight_clique(adj, weight, budget=CLIQUE_SEARCH_BUDGET):
+    """
+    Branch-and-bound maximum-weight clique over int-bitset adjacency lists.
+    Stops after `budget` calls, returning the best clique found so far.
+    Returns (weight, member bitmask).
+    """
+    order = sorted(range(len(adj)), key=lambda v: (weight[v], popcount(adj[v])), reverse=True)
+    best = [0, 0]
+    calls = [0]
+
+    def expand(members, w, cand):
+        calls[0] += 1
+        if w > best[0]:
+            best[0], best[1] = w, members
+        # Remaining candidate weight is the bound; it only shrinks as vertices are tried
+        verts = [v for v in order if cand >> v & 1]
+        left = sum(weight[v] for v in verts)
+        for v in verts:
+            if calls[0] >= budget or w + left <= best[0]:
+                return
+            expand(members | 1 << v, w + weight[v], cand & adj[v])
+            cand &= ~(1 << v)
+            left -= weight[v]
+
+    expand(0, 0, (1 << len(adj)) - 1)
+    return best[0], best[1]
+
+def analyze_feasibility(sessions, student_weights=None):
+    """
+    Pre-solve check that a timetable without teacher or student clashes can
+    exist. Sessions sharing a teacher or student form a conflict graph; any
+    clique in it needs as many distinct slots as its total hours, out of the
+    slots its sessions can reach. Each teacher's and each cohort's sessions
+    are such cliques, and a max-weight clique gives the global lower bound.
+    A greedy colouring over candidate starts gives an upper estimate.
+    Returns a report dict; 'feasible' is False only when infeasibility is proven.
+    """
+    start_time = time.time()
+    weights = student_weights or {}
+    n = len(sessions)
+    hours = [sess.block_size for sess in sessions]
+    cover = [session_coverage(sess) for sess in sessions]
+    problems = []
+
+    def hours_of(mask):
+        return sum(hours[i] for i in range(n) if mask >> i & 1)
+
+    def cover_of(mask):
+        union = 0
+        for i in range(n):
+            if mask >> i & 1:
+                union |= cover[i]
+        return popcount(union)
+
+    def subjects_of(mask):
+        return sorted({sessions[i].subject for i in range(n) if mask >> i & 1})
+
+    for sess in sessions:
+        if not sess.candidates:
+            problems.append(f"Session {sess.id} (Subject {sess.subject}) has no candidate slots")
+
+    # Teacher and cohort cliques
+    by_teacher = defaultdict(int)
+    by_student = defaultdict(int)
+    for i, sess in enumerate(sessions):
+        for tid in sess.teachers:
+            if tid is not None:
+                by_teacher[tid] |= 1 << i
+        for st in sess.students:
+            by_student[st] |= 1 << i
+    for tid, mask in sorted(by_teacher.items()):
+        need, have = hours_of(mask), cover_of(mask)
+        if need > have:
+            problems.append(f"Teacher {tid} needs {need} hours but is available in only {have} slots "
+                            f"(subjects {subjects_of(mask)})")
+    for st, mask in sorted(by_student.items()):
+        need, have = hours_of(mask), cover_of(mask)
+        if need > have:
+            problems.append(f"Cohort of student {st} ({weights.get(st, 1)} students) needs {need} hours "
+                            f"but its subjects reach only {have} slots (subjects {subjects_of(mask)})")
+
+    # Conflict graph and max-weight clique bound
+    adj = [0] * n
+    for mask in list(by_teacher.values()) + list(by_student.values()):
+        for i in range(n):
+            if mask >> i & 1:
+                adj[i] |= mask
+    for i in range(n):
+        adj[i] &= ~(1 << i)
+    clique_hours, clique = max_weight_clique(adj, hours)
+    clique_slots = cover_of(clique)
+    if clique_hours > clique_slots:
+        problems.append(f"{popcount(clique)} mutually conflicting sessions need {clique_hours} hours "
+                        f"but can reach only {clique_slots} slots (subjects {subjects_of(clique)})")
+
+    # Greedy colouring: place sessions on candidate starts, clash-free with placed neighbours
+    used = [0] * n
+    uncoloured = []
+    for i in sorted(range(n), key=lambda i: (hours[i], popcount(adj[i])), reverse=True):
+        blocked = 0
+        for j in range(n):
+            if adj[i] >> j & 1:
+                blocked |= used[j]
+        run = (1 << hours[i]) - 1
+        for sl in sessions[i].candidates:
+            if not (run << sl) & blocked:
+                used[i] = run << sl
+                break
+        else:
+            uncoloured.append(sessions[i].id)
+    colour_slots = 0
+    for mask in used:
+        colour_slots |= mask
+
+    report = {
+        'feasible': not problems,
+        'problems': problems,
+        'clique_hours': clique_hours,
+        'clique_slots': clique_slots,
+        'clique_subjects': subjects_of(clique),
+        'colouring_slots': popcount(colour_slots),
+        'uncoloured': uncoloured,
+        'elapsed': time.time() - start_time
+    }
+    logger.info(f"Feasibility: max clique needs {clique_hours} hours in {clique_slots} reachable slots; "
+                f"greedy colouring uses {report['colouring_slots']}/{SLOTS_PER_WEEK} slots, "
+                f"{len(uncoloured)} sessions uncoloured ({report['elapsed']:.2f}s)")
+    for problem in problems:
+        logger.error(f"Infeasible: {problem}")
+    if not problems and uncoloured:
+        logger.warning(f"Greedy colouring could not place {uncoloured} without clashes; "
+                       f"a clash-free timetable may still exist")
+    return report
+
+# --- Schedule State ---
+class Timetable(dict):
+    """
+    The (day, period) -> [sessions] schedule used by the solver, plus
+    array-backed teacher and student occupancy: one bytearray of per-slot
+    session counts for every teacher and student, and a bitset of the
+    sessions in every slot to test against the sessions' `student_conflicts`
+    masks. Per-(subject, group)
+    weekly and daily hour counts and the sorted periods of each
+    (subject, group, day) are maintained alongside for the max_per_day
+    checks of the move operators and the contiguity rules of the evaluator.
+
+    `sessions` is the immutable session catalog (position == index) and
+    `placement` the compact solution: session index -> start slot
+    (day * PERIODS_PER_DAY + period), or -1 when unplaced. Copying the
+    placement is all it takes to save a solution; Timetable(sessions,
+    placement) rebuilds the dict view from it. Sessions must be added and
+    removed through place()/remove() so the arrays stay in sync with the
+    dict view that format_schedule_output and validate_final_schedule read.
+    """
+
+    def __init__(self, sessions, placement=None):
+        super().__init__()
+        self.sessions = sessions
+        self.placement = array('b', [-1]) * len(sessions)
+        self.teacher_occ = {}   # tid -> bytearray(SLOTS_PER_WEEK)
+        self.student_occ = {}   # student -> bytearray(SLOTS_PER_WEEK)
+        self.group_week = {}    # (sid, grp) -> hours placed
+        self.group_day = {}     # (sid, grp, day) -> hours placed
+        self.group_periods = {} # (sid, grp, day) -> sorted periods
+        self.slot_members = [0] * SLOTS_PER_WEEK  # slot -> bitset of session indices
+        self.teacher_clashes = 0
+        self.student_clashes = 0
+        if placement is not None:
+            for i, start in enumerate(placement):
+                if start >= 0:
+                    self.place(sessions[i], SLOT_COORDS[start])
+
+    def snapshot(self):
+        """Copy of the placement vector, enough to restore this solution."""
+        return self.placement[:]
+
+    def _row(self, table, key):
+        row = table.get(key)
+        if row is None:
+            row = table[key] = bytearray(SLOTS_PER_WEEK)
+        return row
+
+    def start_of(self, sess):
+        """Start slot (day, period) of `sess`, or None if it is not placed."""
+        start = self.placement[sess.index]
+        return SLOT_COORDS[start] if start >= 0 else None
+
+    def place(self, sess, start):
+        """Put `sess` into the block of slots beginning at `start`."""
+        day, period = start
+        bs = sess.block_size
+        self.placement[sess.index] = day * PERIODS_PER_DAY + period
+        group = (sess.subject, sess.group)
+        group_day = group + (day,)
+        self.group_week[group] = self.group_week.get(group, 0) + bs
+        self.group_day[group_day] = self.group_day.get(group_day, 0) + bs
+        periods = self.group_periods.setdefault(group_day, [])
+        bit = 1 << sess.index
+        for off in range(bs):
+            insort(periods, period + off)
+        for off in range(bs):
+            slot = (day, period + off)
+            self.setdefault(slot, []).append(sess)
+            idx = day * PERIODS_PER_DAY + period + off
+            self.slot_members[idx] |= bit
+            for tid in sess.teachers:
+                row = self._row(self.teacher_occ, tid)
+                if row[idx]:
+                    self.teacher_clashes += 1
+                row[idx] += 1
+            for st in sess.students:
+                row = self._row(self.student_occ, st)
+                if row[idx]:
+                    self.student_clashes += 1
+                row[idx] += 1
+
+    def remove(self, sess):
+        """Take `sess` out of the schedule, in O(block size)."""
+        day, period = SLOT_COORDS[self.placement[sess.index]]
+        bs = sess.block_size
+        self.placement[sess.index] = -1
+        group = (sess.subject, sess.group)
+        group_day = group + (day,)
+        self.group_week[group] -= bs
+        self.group_day[group_day] -= bs
+        periods = self.group_periods[group_day]
+        bit = 1 << sess.index
+        for off in range(bs):
+            del periods[bisect_left(periods, period + off)]
+        for off in range(bs):
+            slot = (day, period + off)
+            slot_sessions = self[slot]
+            for i, other in enumerate(slot_sessions):
+                if other is sess:
+                    del slot_sessions[i]
+                    break
+            if not slot_sessions:
+                del self[slot]
+            idx = day * PERIODS_PER_DAY + period + off
+            self.slot_members[idx] &= ~bit
+            for tid in sess.teachers:
+                row = self.teacher_occ[tid]
+                row[idx] -= 1
+                if row[idx]:
+                    self.teacher_clashes -= 1
+            for st in sess.students:
+                row = self.student_occ[st]
+                row[idx] -= 1
+                if row[idx]:
+                    self.student_clashes -= 1
+
+    def day_load_after_move(self, sess, day):
+        """
+        Hours of the session's (subject, group) on `day` if `sess` were
+        moved there from its current slot.
+        """
+        load = self.group_day.get((sess.subject, sess.group, day), 0)
+        start = self.start_of(sess)
+        if start is None or start[0] != day:
+            load += sess.block_size
+        return load
+
+    def teacher_load(self, tid, day):
+        """Number of teaching periods `tid` has on `day`."""
+        row = self.teacher_occ.get(tid)
+        if row is None:
+            return 0
+        return sum(row[day * PERIODS_PER_DAY:(day + 1) * PERIODS_PER_DAY])
+
+    def student_day(self, st, day):
+        """Per-period session counts of student `st` on `day`."""
+        row = self.student_occ.get(st)
+        if row is None:
+            return bytes(PERIODS_PER_DAY)
+        return row[day * PERIODS_PER_DAY:(day + 1) * PERIODS_PER_DAY]
+
+# --- Incremental Evaluation ---
+class IncrementalEvaluator:
+    """
+    Stateful version of evaluate_schedule for the annealing loop.
+    Reads the teacher/student occupancy and the per-(subject, group, day)
+    load tables that the Timetable maintains, and caches each penalty term,
+    so a move only rescores the students, subject groups and days that the
+    moved sessions touch. Scores are identical to evaluate_schedule for the
+    same schedule.
+    """
+    IDLE_PENALTY = 5000
+
+    def __init__(self, timetable, subjects, student_weights=None):
+        self.timetable = timetable
+        self.student_weights = student_weights or {}
+        # (subject) -> (minpd, maxpd, leftover, required, group_count)
+        self.rules = {}
+        for sid, subj in subjects.items():
+            minpd = max(0, subj[6])
+            maxpd = max(0, subj[4])
+            if minpd > maxpd:
+                minpd = maxpd
+            req = subj[3]
+            leftover = req - (req // minpd) * minpd if minpd > 0 else 0
+            self.rules[sid] = (minpd, maxpd, leftover, req, subj[2])
+
+        self.student_penalty = {}   # (st, day) -> penalty
+        self.group_penalty   = {}   # (sid, grp, day) -> penalty
+        self.week_penalty    = {}   # (sid, grp) -> penalty
+        self.penalty = 0
+
+        for sid, (_, _, _, req, n_groups) in self.rules.items():
+            for grp in range(1, n_groups + 1):
+                for d in range(len(DAYS)):
+                    self.group_penalty[(sid, grp, d)] = self._group_day_penalty(sid, grp, d)
+                self.week_penalty[(sid, grp)] = 20000 * abs(timetable.group_week.get((sid, grp), 0) - req)
+        for st in timetable.student_occ:
+            for d in range(len(DAYS)):
+                self.student_penalty[(st, d)] = self._student_day_penalty(st, d)
+        self.penalty = (sum(self.group_penalty.values())
+                        + sum(self.week_penalty.values())
+                        + sum(self.student_penalty.values()))
+
+    @property
+    def score(self):
+        if self.timetable.teacher_clashes or self.timetable.student_clashes:
+            return float('inf')
+        return self.penalty
+
+    # -- penalty terms (same rules as evaluate_schedule) --
+    def _group_day_penalty(self, sid, grp, d):
+        minpd, maxpd, leftover, _, _ = self.rules[sid]
+        actual = self.timetable.group_day.get((sid, grp, d), 0)
+        pen = 0
+        if actual > maxpd:
+            pen += 5000 * (actual - maxpd)
+        if 0 < actual < minpd and actual != leftover:
+            pen += 10000 * (minpd - actual)
+        if actual == minpd:
+            periods = self.timetable.group_periods.get((sid, grp, d), [])
+            for i in range(len(periods)-1):
+                if periods[i+1] - periods[i] != 1:
+                    pen += 20000
+        return pen
+
+    def _student_day_penalty(self, st, d):
+        counts = self.timetable.student_day(st, d)
+        h = sum(counts)
+        if not h:
+            return 0
+        pen = 0
+        if h < 4:
+            pen += 2000 * (4 - h)
+        elif h > 6:
+            pen += 3000 * (h - 6)
+        busy = [p for p, c in enumerate(counts) if c]
+        for i in range(len(busy)-1):
+            pen += self.IDLE_PENALTY * (busy[i+1] - busy[i] - 1)
+        return pen * self.student_weights.get(st, 1)
+
+    # -- moves --
+    def apply(self, moves):
+        """
+        Account for `moves`, a list of (session, old_start, new_start) as
+        journaled by the move operators and already applied to the
+        timetable, and return the new score.
+        """
+        groups, group_days, student_days = set(), set(), set()
+        for sess, old_start, new_start in moves:
+            sid, grp = sess.subject, sess.group
+            groups.add((sid, grp))
+            for start in (old_start, new_start):
+                if start is None:
+                    continue
+                group_days.add((sid, grp, start[0]))
+                for st in sess.students:
+                    student_days.add((st, start[0]))
+
+        for key in groups:
+            if key in self.week_penalty:
+                new = 20000 * abs(self.timetable.group_week.get(key, 0) - self.rules[key[0]][3])
+                self.penalty += new - self.week_penalty[key]
+                self.week_penalty[key] = new
+        for key in group_days:
+            if key in self.group_penalty:
+                new = self._group_day_penalty(*key)
+                self.penalty += new - self.group_penalty[key]
+                self.group_penalty[key] = new
+        for key in student_days:
+            new = self._student_day_penalty(*key)
+            self.penalty += new - self.student_penalty.get(key, 0)
+            self.student_penalty[key] = new
+        return self.score
+
+    def revert(self, moves):
+        """
+        Undo a previous apply(moves) once the timetable has been rolled back
+        with undo_moves, and return the restored score.
+        """
+        return self.apply(moves)
+
 # --- Evaluation Function (penalizes idle gaps) ---
-def greedy_initial(sessions, subjects):
+def greedy_initial(sessions, subjects, student_weights=None, schedule=None):
     """
     Build a starting schedule by placing sessions one-by-one greedily,
-    treating each (subject, group) separately.
+    treating each (subject, group) separately. Students count with the
+    cohort size in `student_weights`.
+    Given a partial `schedule`, only its unplaced sessions are inserted,
+    in place (the LNS repair step).
     """
+    weights = student_weights or {}
+    repairing = schedule is not None
     # keyed by [subject][group]
     subject_requirements = defaultdict(lambda: defaultdict(int))
     for sess in sessions:
-        sid, grp = sess['subject'], sess['group']
-        subject_requirements[sid][grp] += sess.get('block_size', 1)
+        sid, grp = sess.subject, sess.group
+        subject_requirements[sid][grp] += sess.block_size
 
     subjects_scheduled = defaultdict(lambda: defaultdict(int))
-    subject_daily      = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-    teacher_schedule   = defaultdict(set)
     student_schedule   = defaultdict(lambda: defaultdict(list))
-    schedule           = {}  # (day,period) -> [session, ...]
+    if not repairing:
+        schedule = Timetable(sessions)  # (day,period) -> [session, ...]
+    for sess in sessions:
+        start = schedule.start_of(sess)
+        if start is None:
+            continue
+        d, p0 = start
+        bs = sess.block_size
+        subjects_scheduled[sess.subject][sess.group] += bs
+        for stu in sess.students:
+            student_schedule[stu][d].extend(range(p0, p0 + bs))
 
     def session_priority(sess):
-        sid, grp = sess['subject'], sess['group']
+        sid, grp = sess.subject, sess.group
         required = subject_requirements[sid][grp]
         placed   = subjects_scheduled[sid][grp]
         no_sessions_yet = (placed == 0)
         remaining_ratio = (required - placed) / required if required > 0 else 0
-        earliest = min(sess['candidates']) if sess['candidates'] else PERIODS_PER_DAY * len(DAYS)
-        return (no_sessions_yet, remaining_ratio, -earliest, len(sess['students']))
-
-    def has_student_conflict(sess, day, start_period):
-        bs = sess.get('block_size', 1)
-        for offset in range(bs):
-            period = start_period + offset
-            for stu in sess['students']:
-                if period in student_schedule[stu][day]:
-                    return True
-        return False
-
-    def has_teacher_conflict(sess, day, period, schedule):
-        """
-        Check if placing session 'sess' at (day, period) would create 
-        a teacher conflict with any existing sessions.
-        Returns True if there would be a conflict (teacher has 2+ groups).
-        """
-        bs = sess.get('block_size', 1)
-        
-        for offset in range(bs):
-            target_slot = (day, period + offset)
-            if target_slot in schedule:
-                for existing_sess in schedule[target_slot]:
-                    # Skip comparing with self (for swap operations)
-                    if existing_sess.get('id') == sess.get('id'):
-                        continue
-                    
-                    # Check for any common teachers - that would be a conflict
-                    for tid in sess['teachers']:
-                        if tid in existing_sess['teachers']:
-                            return True
-                            
-        return False
+        earliest = min(sess.candidates) if sess.candidates else PERIODS_PER_DAY * len(DAYS)
+        size = sum(weights.get(stu, 1) for stu in sess.students)
+        return (no_sessions_yet, remaining_ratio, -earliest, size)
 
     def slot_score(sess, sl):
         day = sl // PERIODS_PER_DAY
@@ -704,76 +1225,75 @@ def greedy_initial(sessions, subjects):
 
         # 4) student-proximity
         total_dist, count = 0, 0
-        for stu in sess['students']:
+        for stu in sess.students:
+            w = weights.get(stu, 1)
             existing = student_schedule[stu][day]
             if not existing:
-                total_dist += PERIODS_PER_DAY
+                total_dist += w * PERIODS_PER_DAY
             else:
-                total_dist += min(abs(period - p0) for p0 in existing)
-            count += 1
+                total_dist += w * min(abs(period - p0) for p0 in existing)
+            count += w
         proximity_flag = -(total_dist / count if count else PERIODS_PER_DAY)
 
         # 5) gap-penalty
         gap_penalty = 0
-        for stu in sess['students']:
+        for stu in sess.students:
             ex = sorted(student_schedule[stu][day])
             if len(ex) <= 1:
                 continue
             old_gaps = sum(ex[i+1] - ex[i] - 1 for i in range(len(ex)-1))
             new_list = sorted(ex + [period])
             new_gaps = sum(new_list[i+1] - new_list[i] - 1 for i in range(len(new_list)-1))
-            gap_penalty += (new_gaps - old_gaps)
+            gap_penalty += weights.get(stu, 1) * (new_gaps - old_gaps)
         gap_flag = -gap_penalty
 
         return (morning_flag, busy_flag, week_flag, day_flag, proximity_flag, gap_flag)
 
     def find_best_slot(sess):
-        sid, grp = sess['subject'], sess['group']
-        maxpd = sess['max_per_day']
-        bs    = sess.get('block_size', 1)
-        daily = subject_daily[sid][grp]
+        sid, grp = sess.subject, sess.group
+        maxpd = sess.max_per_day
+        bs    = sess.block_size
 
-        for sl in sorted(sess['candidates'], key=lambda x: slot_score(sess, x)):
+        # Best-scoring feasible slot; feasibility is checked first since it is cheaper
+        feasible = []
+        for sl in sess.candidates:
             d, p0 = sl // PERIODS_PER_DAY, sl % PERIODS_PER_DAY
             if p0 + bs > PERIODS_PER_DAY:
                 continue
-            if daily.get(d, 0) + bs > maxpd:
+            if schedule.group_day.get((sid, grp, d), 0) + bs > maxpd:
                 continue
-            if has_teacher_conflict(sess, d, p0, schedule):  # Pass schedule here
+            if has_teacher_conflict(sess, d, p0, schedule):
                 continue
-            if has_student_conflict(sess, d, p0):
+            if any(has_student_conflict(sess, (d, p0 + off), schedule) for off in range(bs)):
                 continue
-            return sl
-        return None
+            feasible.append(sl)
+        return min(feasible, key=lambda x: slot_score(sess, x)) if feasible else None
 
-    total = sum(sess.get('block_size', 1) for sess in sessions)
+    total = sum(sess.block_size for sess in sessions)
 
     while True:
         pending = [
             s for s in sessions
-            if subjects_scheduled[s['subject']][s['group']] < subject_requirements[s['subject']][s['group']]
+            if subjects_scheduled[s.subject][s.group] < subject_requirements[s.subject][s.group]
+            and schedule.start_of(s) is None
         ]
         if not pending:
             break
         pending.sort(key=session_priority, reverse=True)
         progress = False
         for sess in pending:
-            sid, grp = sess['subject'], sess['group']
+            sid, grp = sess.subject, sess.group
             if subjects_scheduled[sid][grp] >= subject_requirements[sid][grp]:
                 continue
             slot = find_best_slot(sess)
             if slot is not None:
                 d, p0 = slot // PERIODS_PER_DAY, slot % PERIODS_PER_DAY
-                bs = sess.get('block_size', 1)
+                bs = sess.block_size
+                schedule.place(sess, (d, p0))
                 for off in range(bs):
                     p = p0 + off
-                    schedule.setdefault((d, p), []).append(sess)
-                    idx = d * PERIODS_PER_DAY + p
-                    for tid in sess['teachers']:
-                        teacher_schedule[tid].add(idx)
-                    for stu in sess['students']:
+                    for stu in sess.students:
                         student_schedule[stu][d].append(p)
-                    subject_daily[sid][grp][d] += 1
                 subjects_scheduled[sid][grp] += bs
                 progress = True
         if not progress:
@@ -781,10 +1301,13 @@ def greedy_initial(sessions, subjects):
 
     placed = sum(sum(g.values()) for g in subjects_scheduled.values())
     unplaced = [
-        s['id'] for s in sessions
-        if subjects_scheduled[s['subject']][s['group']] < subject_requirements[s['subject']][s['group']]
+        s.id for s in sessions
+        if subjects_scheduled[s.subject][s.group] < subject_requirements[s.subject][s.group]
     ]
-    logger.info(f"greedy_initial placed {placed}/{total} hours; unplaced={unplaced}")
+    if repairing:
+        logger.debug(f"greedy repair placed {placed}/{total} hours")
+    else:
+        logger.info(f"greedy_initial placed {placed}/{total} hours; unplaced={unplaced}")
     return schedule
 
 def count_placed_hours_per_group(schedule):
@@ -795,130 +1318,1185 @@ def count_placed_hours_per_group(schedule):
     placed = defaultdict(lambda: defaultdict(int))
     for (day, period), slot_sessions in schedule.items():
         for sess in slot_sessions:
-            sid, grp = sess['subject'], sess['group']
-            placed[sid][grp] += sess.get('block_size', 1)
+            sid, grp = sess.subject, sess.group
+            placed[sid][grp] += sess.block_size
     return placed
 
-# --- Solver with Simulated Annealing & Fallback ---
-def solve_timetable(sessions, subjects, teachers, hour_blocker, time_limit=1200, stop_flag=None):
+# --- Warm Start ---
+def load_saved_schedule(path='schedule_output.json'):
     """
-    Greedy initial → fallback for missing → simulated annealing loop.
+    Read a schedule written by write_schedule (JSON layout). Returns None,
+    with a log line, when the file is missing or unreadable.
     """
-    start_time = time.time()
-    original_sessions = copy.deepcopy(sessions)
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        saved['days']
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.error(f"Cannot warm-start from {path}: {e}")
+        return None
+    return saved
+
+def saved_lessons(saved):
+    """
+    The lessons of a saved formatted schedule as {(subject, group): {session id: lesson}},
+    each lesson a dict of its 'slots' and the 'teachers' and 'students' ids it had.
+    Split parallel groups share their session's id and count as group 1.
+    """
+    lessons = defaultdict(lambda: defaultdict(lambda: {'slots': [], 'teachers': set(), 'students': set()}))
+    for day, periods in saved['days'].items():
+        for period, entries in periods.items():
+            for entry in entries:
+                grp = 1 if entry.get('is_parallel') else entry.get('group', 1)
+                slot = int(day) * PERIODS_PER_DAY + int(period)
+                lesson = lessons[(entry['subject_id'], grp)][entry['id']]
+                if slot not in lesson['slots']:
+                    lesson['slots'].append(slot)
+                lesson['teachers'].update(t['id'] for t in entry.get('teachers', ()))
+                lesson['students'].update(st['id'] for st in entry.get('students', ()))
+    return lessons
+
+def saved_fallback_groups(sessions, saved):
+    """
+    (subject, group) pairs that `sessions` holds as blocks or as lessons of
+    several teachers but the saved schedule only as single hours of one
+    teacher each, i.e. where the saved run fell back to singles. A warm
+    start falls back on the same groups so that their saved lessons can be
+    matched.
+    """
+    lessons = saved_lessons(saved)
+    unlike_fallback = {(sess.subject, sess.group) for sess in sessions
+                       if sess.block_size > 1 or len(sess.teachers) > 1}
+    return [key for key in unlike_fallback
+            if lessons.get(key) and all(len(lesson['slots']) == 1 and len(lesson['teachers']) == 1
+                                        for lesson in lessons[key].values())]
+
+def warm_start_schedule(sessions, saved, student_groups=None, keep_changed=True):
+    """
+    Map a saved formatted schedule onto freshly built `sessions`.
+    Saved lessons are grouped into blocks by session id. Sessions take the
+    saved block with their own id, and the rest of each (subject, group,
+    block length) are paired in order with the saved blocks left over, by
+    start slot (block ids carry a random suffix, so they rarely match
+    across runs). Sessions still without a block (e.g. blocks where the
+    saved run fell back to single hours) may take any run of unclaimed
+    saved hours of their (subject, group) that fits them. A session is only
+    placed if the start is still a candidate slot, within max_per_day, and
+    clashes with no teacher or student placed before.
+    Without `keep_changed` (repair mode), a session is also left out if its
+    teachers or students (cohorts expanded with `student_groups`) differ
+    from those of its saved block, or for unpaired sessions (changed
+    length) of its (subject, group). Everything else stays unplaced for
+    greedy_initial to fill. Returns (Timetable, kept, dropped, changed).
+    """
+    members = cohort_members(student_groups) if student_groups else {}
+    blocks = defaultdict(dict)  # (subject, group, length) -> {id: lesson}
+    groups = defaultdict(lambda: {'teachers': set(), 'students': set()})  # (subject, group) -> all its lessons
+    for (sid, grp), by_id in saved_lessons(saved).items():
+        for sess_id, lesson in by_id.items():
+            blocks[(sid, grp, len(lesson['slots']))][sess_id] = lesson
+            groups[(sid, grp)]['teachers'] |= lesson['teachers']
+            groups[(sid, grp)]['students'] |= lesson['students']
+
+    by_shape = defaultdict(list)
+    for sess in sessions:
+        by_shape[(sess.subject, sess.group, sess.block_size)].append(sess)
+    pairs, unmatched = [], []
+    free_hours = defaultdict(set)  # (subject, group) -> saved slots no session was paired with
+    for (sid, grp, bs), shape_sessions in by_shape.items():
+        options = blocks.pop((sid, grp, bs), {})
+        rest = []
+        for sess in shape_sessions:
+            if sess.id in options:
+                pairs.append((sess, options.pop(sess.id)))
+            else:
+                rest.append(sess)
+        left = sorted(options.values(), key=lambda lesson: min(lesson['slots']))
+        pairs.extend(zip(rest, left))
+        unmatched.extend(rest[len(left):])
+        for lesson in left[len(rest):]:
+            free_hours[(sid, grp)].update(lesson['slots'])
+    for (sid, grp, length), options in blocks.items():
+        for lesson in options.values():
+            free_hours[(sid, grp)].update(lesson['slots'])
+
+    def changed_since(sess, lesson):
+        teachers = {tid for tid in sess.teachers if tid is not None}
+        students = {st for rep in sess.students for st in members.get(rep, [rep])}
+        return teachers != lesson['teachers'] or students != lesson['students']
+
+    schedule = Timetable(sessions)
+
+    def try_place(sess, start):
+        day, period = SLOT_COORDS[start]
+        if start not in sess.candidates or schedule.day_load_after_move(sess, day) > sess.max_per_day:
+            return False
+        clashes = schedule.teacher_clashes + schedule.student_clashes
+        schedule.place(sess, (day, period))
+        if schedule.teacher_clashes + schedule.student_clashes > clashes:
+            schedule.remove(sess)
+            return False
+        return True
+
+    kept = dropped = changed = 0
+    for sess, lesson in sorted(pairs, key=lambda pair: -pair[0].block_size):
+        if not keep_changed and changed_since(sess, lesson):
+            changed += 1
+        elif try_place(sess, min(lesson['slots'])):
+            kept += 1
+        else:
+            dropped += 1
+    for sess in sorted(unmatched, key=lambda s: -s.block_size):
+        free = free_hours[(sess.subject, sess.group)]
+        if not free:
+            continue
+        if not keep_changed and changed_since(sess, groups[(sess.subject, sess.group)]):
+            changed += 1
+            continue
+        for start in sess.candidates:
+            hours = range(start, start + sess.block_size)
+            if free.issuperset(hours) and try_place(sess, start):
+                free.difference_update(hours)
+                kept += 1
+                break
+    return schedule, kept, dropped, changed
 
-    # 1) Greedy initial
-    current = greedy_initial(sessions, subjects)
+# --- Checkpoints ---
+# Little-endian binary layout: header, current and best placement vectors
+# (one signed byte per session), Mersenne Twister state, operator weights.
+CHECKPOINT_MAGIC = b'TTCP'
+CHECKPOINT_VERSION = 1
+_CHECKPOINT_HEADER = struct.Struct('<4sHIIQddddd')
+_RNG_STATE = struct.Struct('<B625Id')
 
-    # 2) Fallback if any (sid,grp) under-scheduled
+def sessions_fingerprint(sessions):
+    """
+    CRC of what a placement vector depends on, to refuse checkpoints of
+    other session lists: the sessions' shape and teachers, their candidate
+    slots (teacher availability, hour blocker) and their students.
+    """
+    signature = [(s.subject, s.group, s.block_size, s.teachers, tuple(sorted(s.candidates)), s.students)
+                 for s in sessions]
+    return zlib.crc32(repr(signature).encode())
+
+def save_checkpoint(path, sessions, state):
+    """
+    Write an annealing chain `state` (see anneal) to `path` atomically:
+    the file is written and fsynced under a temporary name, then renamed
+    over the old checkpoint, so a crash leaves either the old or the new one.
+    """
+    version, mt, gauss = state['rng']
+    weights = b''.join(
+        struct.pack('<B', len(name.encode())) + name.encode() + struct.pack('<d', w)
+        for name, w in state['weights'].items()
+    )
+    blob = b''.join([
+        _CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, sessions_fingerprint(sessions),
+                                len(sessions), state['iteration'], state['elapsed'], state['temp'],
+                                state['t_end'], state['current_score'], state['best_score']),
+        array('b', state['current']).tobytes(),
+        array('b', state['best']).tobytes(),
+        _RNG_STATE.pack(version, *mt, float('nan') if gauss is None else gauss),
+        struct.pack('<H', len(state['weights'])), weights,
+    ])
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_checkpoint(path, sessions):
+    """
+    Read a checkpoint written by save_checkpoint for these `sessions`.
+    Returns the state dict, or None (with a log line) if the file is
+    missing, damaged or belongs to different sessions.
+    """
+    try:
+        with open(path, 'rb') as f:
+            blob = f.read()
+        (magic, version, fingerprint, n, iteration, elapsed, temp, t_end,
+         current_score, best_score) = _CHECKPOINT_HEADER.unpack_from(blob)
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            raise ValueError("not a solver checkpoint")
+        if n != len(sessions) or fingerprint != sessions_fingerprint(sessions):
+            raise ValueError("saved for different sessions (data changed since?)")
+        pos = _CHECKPOINT_HEADER.size
+        current = array('b', blob[pos:pos + n])
+        best = array('b', blob[pos + n:pos + 2 * n])
+        pos += 2 * n
+        rng = _RNG_STATE.unpack_from(blob, pos)
+        pos += _RNG_STATE.size
+        (count,) = struct.unpack_from('<H', blob, pos)
+        pos += 2
+        weights = {}
+        for _ in range(count):
+            length = blob[pos]
+            name = blob[pos + 1:pos + 1 + length].decode()
+            (weights[name],) = struct.unpack_from('<d', blob, pos + 1 + length)
+            pos += 1 + length + 8
+    except (OSError, ValueError, struct.error, IndexError, UnicodeDecodeError) as e:
+        logger.error(f"Cannot resume from {path}: {e}")
+        return None
+    return {
+        'iteration': iteration, 'elapsed': elapsed, 'temp': temp, 't_end': t_end,
+        # Scores are whole numbers unless infinite
+        'current_score': current_score if math.isinf(current_score) else int(current_score),
+        'best_score': best_score if math.isinf(best_score) else int(best_score),
+        'current': current, 'best': best,
+        'rng': (rng[0], tuple(rng[1:-1]), None if math.isnan(rng[-1]) else rng[-1]),
+        'weights': weights,
+    }
+
+# --- Solver with Simulated Annealing & Fallback ---
+def solve_timetable(sessions, subjects, teachers, hour_blocker, time_limit=1200, stop_flag=None,
+                    student_groups=None, workers=1, stats=None, engine="sa", check_feasibility=True,
+                    metrics=None, initial_schedule=None, repair=False, checkpoint=None, resume=False):
+    """
+    Greedy initial → fallback for missing → search engine.
+    `student_groups` (from load_data) weights each cohort by its size.
+    engine="sa": simulated annealing; with `workers` > 1, that many
+    independent chains run in separate processes and the best one wins.
+    engine="pt": parallel tempering with `workers` replicas (PT_REPLICAS
+    if workers is 1).
+    engine="tabu" / "lns": tabu search / large neighbourhood search, on
+    `workers` chains like "sa".
+    If a `stats` dict is given, it is filled with the initial and best
+    scores, the best-so-far `trace` of (seconds, score), per-worker
+    statistics and the per-operator counters merged over all workers.
+    Unless `check_feasibility` is False, analyze_feasibility runs first and
+    (None, None) is returned if a clash-free timetable is impossible; its
+    report is stored in stats['feasibility'].
+    Phase timings, counters and gauges go to `metrics` (a RunMetrics).
+    `initial_schedule` (a format_schedule_output result, e.g. from
+    load_saved_schedule) warm-starts the search: its still-valid placements
+    are kept (see warm_start_schedule), greedy_initial places the rest unless
+    that scores worse than leaving them out, and the search budget is capped at WARM_START_TIME_LIMIT; annealing chains
+    start cold and stop at their first stall (see anneal).
+    With `repair`, the search is repair_search instead of `engine`: lessons
+    whose teachers, students or length changed since the saved schedule
+    are unassigned, the kept placements are anchors and moving them off
+    their slots costs displacement_penalty each, so only the changed or
+    infeasible lessons (and the few needed to fit them back in) move.
+    Single-chain "sa" runs save their state to the `checkpoint` file every
+    CHECKPOINT_INTERVAL seconds; the file is removed when the run ends by
+    itself and kept when it is stopped. With `resume`, a matching
+    checkpoint is picked up where it stopped, within what is left of
+    `time_limit`.
+    """
+    if repair and initial_schedule is None:
+        raise ValueError("Repair mode needs an initial_schedule")
+    if engine != "pt" and engine not in SEARCH_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    start_time = time.time()
+    metrics = metrics or RunMetrics()
+    metrics.gauge('engine', engine)
+    metrics.gauge('workers', workers)
+    metrics.gauge('sessions', len(sessions))
+    original_sessions = [sess.copy() for sess in sessions]
+    student_weights = cohort_weights(student_groups) if student_groups else None
+
+    # 0) Pre-solve feasibility analysis
+    if check_feasibility:
+        with metrics.phase('feasibility'):
+            report = analyze_feasibility(sessions, student_weights)
+        metrics.gauge('feasible', report['feasible'])
+        if stats is not None:
+            stats['feasibility'] = report
+        if not report['feasible']:
+            logger.error("A timetable without teacher/student clashes is impossible, aborting.")
+            return None, None
+
+    anchors = None
+
+    def initial_schedule_for(sessions):
+        nonlocal anchors
+        if initial_schedule is None:
+            return greedy_initial(sessions, subjects, student_weights)
+        schedule, kept, dropped, changed = warm_start_schedule(
+            sessions, initial_schedule, student_groups, keep_changed=not repair
+        )
+        logger.info(f"Warm start: kept {kept} saved placements, dropped {dropped}, {changed} changed")
+        metrics.gauge('warm_start_kept', kept)
+        metrics.gauge('warm_start_dropped', dropped)
+        metrics.gauge('warm_start_changed', changed)
+        anchors = schedule.snapshot()
+        saved_score = IncrementalEvaluator(schedule, subjects, student_weights).score
+        filled = greedy_initial(sessions, subjects, student_weights, schedule=schedule)
+        if IncrementalEvaluator(filled, subjects, student_weights).score > saved_score:
+            # The saved run left these lessons out because placing them costs more
+            return Timetable(sessions, anchors)
+        return filled
+
+    # 1) Greedy initial (around the saved placements when warm-starting)
+    with metrics.phase('greedy_initial'):
+        current = initial_schedule_for(sessions)
+
+    # 2) Fallback if any (sid,grp) under-scheduled, or fell back in the saved schedule
     placed_counts = count_placed_hours_per_group(current)
     missing_any = any(
         placed_counts[sid].get(grp, 0) < subj[3]
         for sid, subj in subjects.items()
         for grp in range(1, subj[2] + 1)
     )
-    if missing_any:
+    saved_fallbacks = saved_fallback_groups(sessions, initial_schedule) if initial_schedule is not None else []
+    if missing_any or saved_fallbacks:
         logger.info("Fallback: replacing incomplete groups with singles")
-        sessions = fallback_replace_blocks_with_all_singles(
-            original_sessions, current, subjects, teachers, hour_blocker
-        )
-        current = greedy_initial(sessions, subjects)
+        metrics.count('fallbacks')
+        with metrics.phase('fallback'):
+            sessions = fallback_replace_blocks_with_all_singles(
+                original_sessions, current, subjects, teachers, hour_blocker, also=saved_fallbacks
+            )
+            current = initial_schedule_for(sessions)
+        metrics.gauge('sessions_after_fallback', len(sessions))
+
+    # 2b) Or continue from a checkpoint
+    resume_state = None
+    chain_checkpoint = checkpoint if engine == "sa" and workers == 1 and not repair else None
+    if checkpoint and not chain_checkpoint:
+        logger.warning("Checkpoints are only written by single-chain simulated annealing")
+    if resume and chain_checkpoint:
+        resume_state = load_checkpoint(chain_checkpoint, sessions)
+        if resume_state:
+            current = Timetable(sessions, resume_state['current'])
+            metrics.gauge('resumed_at_iteration', resume_state['iteration'])
+
+    # 3) Score the starting point
+    evaluator = IncrementalEvaluator(current, subjects, student_weights)
+    initial_score = evaluator.score
+    metrics.gauge('initial_score', initial_score)
+    logger.info(f"Initial score: {initial_score}")
+
+    # 4) Search: parallel tempering, or one of SEARCH_ENGINES on one or `workers` chains
+    search_start = time.time()
+    remaining = time_limit - (search_start - start_time)
+    if initial_schedule is not None:
+        remaining = min(remaining, WARM_START_TIME_LIMIT)
+    if resume_state:
+        remaining -= resume_state['elapsed']
+    trace = []
+    with metrics.phase('search'):
+        if repair:
+            chain_start = time.time()
+            selector = OperatorSelector()
+            best_placement, best_score, iterations = repair_search(
+                current, evaluator, subjects, anchors, remaining, stop_flag=stop_flag, selector=selector, trace=trace
+            )
+            metrics.gauge('repair_moved', sum(a >= 0 and p != a for a, p in zip(anchors, best_placement)))
+            worker_stats = [{
+                'worker': 0, 'seed': None, 'iterations': iterations,
+                'best_score': best_score, 'elapsed': time.time() - chain_start,
+                'operators': selector.summary()
+            }]
+        elif engine == "pt":
+            best_placement, best_score, worker_stats = parallel_tempering(
+                sessions, subjects, current.snapshot(), remaining,
+                replicas=workers if workers > 1 else PT_REPLICAS,
+                stop_flag=stop_flag, student_weights=student_weights, trace=trace
+            )
+        elif workers > 1:
+            best_placement, best_score, worker_stats = search_parallel(
+                sessions, subjects, current.snapshot(), remaining, workers,
+                stop_flag=stop_flag, student_weights=student_weights, engine=engine,
+                warm=initial_schedule is not None
+            )
+        else:
+            chain_start = time.time()
+            selector = OperatorSelector()
+            extra = {'checkpoint': chain_checkpoint, 'resume_state': resume_state} if chain_checkpoint else {}
+            if engine == "sa" and initial_schedule is not None:
+                extra['warm'] = True
+            best_placement, best_score, iterations = SEARCH_ENGINES[engine](
+                current, evaluator, subjects, remaining, stop_flag=stop_flag, selector=selector, trace=trace,
+                **extra
+            )
+            worker_stats = [{
+                'worker': 0, 'seed': None, 'iterations': iterations,
+                'best_score': best_score, 'elapsed': time.time() - chain_start,
+                'operators': selector.summary()
+            }]
+    logger.info(f"Final best score: {best_score}")
+    if chain_checkpoint and not (stop_flag and stop_flag()) and os.path.exists(chain_checkpoint):
+        os.remove(chain_checkpoint)  # finished: nothing left to resume
+    metrics.gauge('best_score', best_score)
+    metrics.count('iterations', sum(w['iterations'] for w in worker_stats))
+    metrics.operators = merge_operator_stats(w['operators'] for w in worker_stats)
+    if len(worker_stats) > 1:
+        log_operator_summary(metrics.operators, "[all] ")
+    if stats is not None:
+        # Overall best-so-far curve, in seconds since solve_timetable started
+        setup_time = search_start - start_time
+        stats['trace'] = [(setup_time, initial_score)]
+        for t, score in sorted(trace + [p for w in worker_stats for p in w.pop('trace', [])]):
+            if not stats['trace'] or score < stats['trace'][-1][1]:
+                stats['trace'].append((setup_time + t, score))
+        stats['initial_score'] = initial_score
+        stats['best_score'] = best_score
+        stats['workers'] = worker_stats
+        stats['operators'] = metrics.operators
+
+    # Subject-student mapping (cohort representatives) for splitting parallel sessions
+    subj_students = {}
+    for sess in sessions:
+        if sess.parallel_with is not None:
+            subj_students.setdefault(sess.subject, set()).update(sess.students)
 
-    # 3) Score & keep best
-    current_score = evaluate_schedule(current, sessions, subjects)
-    best_schedule = copy.deepcopy(current)
-    best_score = current_score
-    logger.info(f"Initial score: {best_score}")
+    # Now split the parallel sessions in the best schedule
+    logger.info("Splitting parallel subject groups...")
+    with metrics.phase('split_parallel_sessions'):
+        best_schedule = Timetable(sessions, best_placement)
+        best_schedule = split_parallel_sessions(best_schedule, subjects, subj_students, student_weights)
+    
+    # 5) Build students_dict for output
+    students_dict = {
+        s[0]: {'id': s[0], 'name': f"{s[1]} {s[2] or ''} {s[3]}".strip()}
+        for s in get_student()
+    }
+    return best_schedule, students_dict
+
+# --- Operator Selection ---
+class OperatorSelector:
+    """
+    Adaptive roulette over move operators (or LNS destroy heuristics).
+    Per operator it tracks proposals, valid proposals, no-ops (no change),
+    teacher-clash rejections, time spent with a log2 µs histogram,
+    acceptances and improvements. Every OPERATOR_SEGMENT proposals each
+    weight moves toward the operator's reward per second of proposal time
+    in that segment, relative to the best operator.
+    """
+    def __init__(self):
+        self.weights = {}
+        self.stats = {}
+        self.last = None
+        self.proposals = 0
+        self._segment = {}  # name -> [reward, seconds] in the current segment
+
+    def _stats(self, name):
+        if name not in self.stats:
+            self.stats[name] = {'proposed': 0, 'valid': 0, 'noop': 0, 'conflict': 0,
+                                'accepted': 0, 'improved': 0, 'improvement': 0, 'time': 0.0,
+                                'time_hist': [0] * OPERATOR_TIME_BUCKETS}
+        return self.stats[name]
+
+    def choose(self, operators):
+        """Pick one of `operators` by weight and remember it as `last`."""
+        weights = [self.weights.setdefault(op.__name__, 1.0) for op in operators]
+        op = random.choices(operators, weights)[0]
+        self.last = op.__name__
+        return op
+
+    def record_proposal(self, name, elapsed, valid, noop=False, conflict=False):
+        st = self._stats(name)
+        st['proposed'] += 1
+        st['valid'] += bool(valid)
+        st['noop'] += noop
+        st['conflict'] += conflict
+        st['time'] += elapsed
+        st['time_hist'][min(int(elapsed * 1e6).bit_length(), OPERATOR_TIME_BUCKETS - 1)] += 1
+        self._segment.setdefault(name, [0.0, 0.0])[1] += elapsed
+        self.proposals += 1
+        if self.proposals % OPERATOR_SEGMENT == 0:
+            self._reweight()
+
+    def record_outcome(self, name, accepted, improvement):
+        st = self._stats(name)
+        segment = self._segment.setdefault(name, [0.0, 0.0])
+        if accepted:
+            st['accepted'] += 1
+            segment[0] += OPERATOR_ACCEPT_REWARD
+        if 0 < improvement < float('inf'):
+            st['improved'] += 1
+            st['improvement'] += improvement
+            segment[0] += 1
+
+    def _reweight(self):
+        rates = {name: reward / seconds for name, (reward, seconds) in self._segment.items() if seconds > 0}
+        top = max(rates.values(), default=0)
+        if top > 0:
+            for name, rate in rates.items():
+                w = (1 - OPERATOR_REACTION) * self.weights.get(name, 1.0) + OPERATOR_REACTION * rate / top
+                self.weights[name] = max(OPERATOR_MIN_WEIGHT, w)
+        self._segment = {}
+
+    def summary(self):
+        """Per-operator weight, counters and mean proposal time in µs."""
+        return {name: dict(st, time_hist=list(st['time_hist']), weight=self.weights.get(name, 1.0),
+                           mean_us=1e6 * st['time'] / max(st['proposed'], 1))
+                for name, st in self.stats.items()}
+
+    def log_summary(self, tag=""):
+        log_operator_summary(self.summary(), tag)
+
+
+def merge_operator_stats(summaries):
+    """
+    Combine OperatorSelector summaries (one per chain or replica) into one:
+    counters and histograms are summed, weights averaged, mean_us recomputed.
+    """
+    merged = {}
+    for summary in summaries:
+        for name, st in summary.items():
+            if name not in merged:
+                merged[name] = dict(st, time_hist=list(st['time_hist']), weight=[st['weight']])
+                continue
+            m = merged[name]
+            for key in ('proposed', 'valid', 'noop', 'conflict', 'accepted', 'improved', 'improvement', 'time'):
+                m[key] += st[key]
+            m['time_hist'] = [a + b for a, b in zip(m['time_hist'], st['time_hist'])]
+            m['weight'].append(st['weight'])
+    for m in merged.values():
+        m['weight'] = sum(m['weight']) / len(m['weight'])
+        m['mean_us'] = 1e6 * m['time'] / max(m['proposed'], 1)
+    return merged
+
+def log_operator_summary(summary, tag=""):
+    for name, st in sorted(summary.items()):
+        logger.info(f"{tag}Operator {name}: weight={st['weight']:.2f}, proposed={st['proposed']}, "
+                    f"valid={st['valid']}, noop={st['noop']}, conflict={st['conflict']}, "
+                    f"accepted={st['accepted']}, improved={st['improved']}, mean={st['mean_us']:.0f}µs")
+
+# --- Simulated Annealing ---
+def metropolis_step(current, evaluator, subjects, current_score, temp, selector=None):
+    """
+    Apply one random neighbour move to `current` and keep it with the
+    Metropolis rule at `temp`, undoing it otherwise. With a `selector`, the
+    operator is chosen adaptively and the outcome is credited to it.
+    Returns (score, accepted).
+    """
+    moves = []
+    generate_neighbor(current, subjects, moves, selector=selector)
+    neighbor_score = evaluator.apply(moves)
+    delta = neighbor_score - current_score
+    accepted = delta < 0 or random.random() < math.exp(-delta / temp)
+    if selector and moves:
+        selector.record_outcome(selector.last, accepted, -delta)
+    if accepted:
+        return neighbor_score, True
+    undo_moves(current, moves)
+    evaluator.revert(moves)
+    return current_score, False
+
+def sample_deltas(current, evaluator, subjects, samples=SA_CALIBRATION_MOVES):
+    """Finite, non-zero score deltas of `samples` random neighbours of `current`; the moves are undone."""
+    current_score = evaluator.score
+    deltas = []
+    for _ in range(samples):
+        moves = []
+        generate_neighbor(current, subjects, moves)
+        delta = evaluator.apply(moves) - current_score
+        undo_moves(current, moves)
+        evaluator.revert(moves)
+        if delta != 0 and math.isfinite(delta):
+            deltas.append(delta)
+    return deltas
+
+def calibrate_temperature(current, evaluator, subjects, samples=SA_CALIBRATION_MOVES):
+    """
+    Starting temperature at which an average uphill move from `current` is
+    accepted with probability SA_INITIAL_ACCEPTANCE, from a sample of
+    neighbour deltas.
+    """
+    uphill = [delta for delta in sample_deltas(current, evaluator, subjects, samples) if delta > 0]
+    if not uphill:
+        return 1.0
+    return -(sum(uphill) / len(uphill)) / math.log(SA_INITIAL_ACCEPTANCE)
 
-    # 4) Simulated annealing
-    temp = 1.0
-    cooling_rate = 0.999
-    min_temp = 0.001
+def anneal(current, evaluator, subjects, time_limit, stop_flag=None, tag="", selector=None,
+           trace=None, checkpoint=None, resume_state=None, warm=False):
+    """
+    Simulated annealing on `current` (modified in place) for at most
+    `time_limit` seconds. The starting temperature is calibrated from
+    sampled move deltas and cools geometrically with elapsed time, reaching
+    SA_FINAL_TEMP_RATIO of it at the deadline. When STALL_THRESHOLD
+    iterations pass without improvement while the chain is frozen (almost
+    no uphill move accepted), it jumps back to the best schedule and
+    reheats to SA_REHEAT_RATIO of the last starting temperature.
+    Operators are picked by `selector` (a fresh OperatorSelector if None).
+    Every new best is appended to `trace` as (seconds, score).
+    With a `checkpoint` path, the chain state is saved there every
+    CHECKPOINT_INTERVAL seconds and on exit (see save_checkpoint);
+    `resume_state` (from load_checkpoint, with `current` already at its
+    current placement) continues such a chain where it stopped.
+    A `warm` chain (started from a saved schedule) starts at
+    SA_WARM_TEMP_RATIO of the calibrated temperature so it refines rather
+    than leaves the saved schedule, and stops at the first stall instead of
+    reheating.
+    Returns (best_placement, best_score, iterations).
+    """
+    selector = selector or OperatorSelector()
+    start_time = time.time()
+    deadline = start_time + time_limit * 0.95
+    current_score = evaluator.score
+    best_placement = current.snapshot()
+    best_score = current_score
+    if trace is not None:
+        trace.append((0.0, best_score))
     iteration = 0
+    elapsed_before = 0.0
+
+    if resume_state:
+        # Continue the cooling from the saved temperature towards the saved final one
+        best_placement = array('b', resume_state['best'])
+        best_score = resume_state['best_score']
+        t_start, t_end = resume_state['temp'], resume_state['t_end']
+        iteration = resume_state['iteration']
+        elapsed_before = resume_state['elapsed']
+        random.setstate(resume_state['rng'])
+        selector.weights.update(resume_state['weights'])
+        logger.info(f"{tag}Resumed at iteration {iteration}, best_score={best_score}, temp={t_start:.1f}")
+    else:
+        t_start = calibrate_temperature(current, evaluator, subjects)
+        t_end = t_start * SA_FINAL_TEMP_RATIO
+        if warm:
+            t_start *= SA_WARM_TEMP_RATIO
+        logger.info(f"{tag}Calibrated starting temperature: {t_start:.1f}")
+    phase_start = time.time()
+    temp = t_start
     stall_count = 0
+    uphill_accepted = 0
+    reheats = 0
     last_log_time = start_time
-    max_iterations = 100000  # Add a hard iteration limit
+    last_checkpoint = start_time
+
+    def save():
+        save_checkpoint(checkpoint, current.sessions, {
+            'iteration': iteration, 'elapsed': elapsed_before + time.time() - start_time,
+            'temp': temp, 't_end': t_end, 'current_score': current_score, 'best_score': best_score,
+            'current': current.placement, 'best': best_placement,
+            'rng': random.getstate(), 'weights': selector.weights
+        })
 
-    while temp > min_temp and (time.time() - start_time < time_limit) and iteration < max_iterations:
+    while True:
         if stop_flag and stop_flag():
             break
             
         # Safety timeout check - log progress and check if we're making progress
         current_time = time.time()
         if current_time - last_log_time > 30:  # Log every 30 seconds
-            logger.info(f"Still running... Iter {iteration}, best_score={best_score}, temp={temp:.4f}")
+            logger.info(f"{tag}Still running... Iter {iteration}, best_score={best_score}, temp={temp:.4f}")
             last_log_time = current_time
             
         # Hard timeout safety
-        if current_time - start_time > time_limit * 0.95:
-            logger.warning("Time limit nearly reached, finishing up...")
+        if current_time >= deadline:
             break
+        if checkpoint and current_time - last_checkpoint >= CHECKPOINT_INTERVAL:
+            save()
+            last_checkpoint = current_time
+
+        # Geometric cooling from t_start to t_end over the rest of the budget
+        progress = (current_time - phase_start) / max(deadline - phase_start, 1e-9)
+        temp = t_start * (t_end / t_start) ** progress
             
         iteration += 1
 
-        neighbor = generate_neighbor(current, subjects)
-        neighbor_score = evaluate_schedule(neighbor, sessions, subjects)
-        delta = neighbor_score - current_score
-
-        if delta < 0 or random.random() < math.exp(-delta / temp):
-            current, current_score = neighbor, neighbor_score
-            if current_score < best_score:
-                best_score = current_score
-                best_schedule = copy.deepcopy(current)
-                logger.info(f"Iter {iteration}: New best score = {best_score}")
-                stall_count = 0
-            else:
-                stall_count += 1
+        previous_score = current_score
+        current_score, accepted = metropolis_step(current, evaluator, subjects, current_score, temp, selector)
+        if accepted and current_score > previous_score:
+            uphill_accepted += 1
+        if accepted and current_score < best_score:
+            best_score = current_score
+            best_placement = current.snapshot()
+            logger.info(f"{tag}Iter {iteration}: New best score = {best_score}")
+            if trace is not None:
+                trace.append((time.time() - start_time, best_score))
+            stall_count = 0
+            uphill_accepted = 0
         else:
             stall_count += 1
 
         if iteration % LOG_INTERVAL == 0:
-            logger.info(f"Iter {iteration}, best_score={best_score}, temp={temp:.4f}, stall_count={stall_count}")
+            logger.info(f"{tag}Iter {iteration}, best_score={best_score}, temp={temp:.4f}, stall_count={stall_count}")
         if stall_count >= STALL_THRESHOLD:
-            logger.error("No improvement for too long, stopping.")
+            if warm:
+                logger.info(f"{tag}Iter {iteration}: no improvement in {STALL_THRESHOLD} iterations, stopping")
+                break
+            stall_count = 0
+            frozen = uphill_accepted < STALL_THRESHOLD * SA_FROZEN_ACCEPTANCE
+            uphill_accepted = 0
+            if not frozen:
+                continue
+            # Reheat: restart cooling from the best schedule at a lower starting temperature
+            moves = []
+            jump_to_placement(current, best_placement, moves)
+            current_score = evaluator.apply(moves)
+            t_start = max(t_start * SA_REHEAT_RATIO, t_end)
+            phase_start = current_time
+            reheats += 1
+            logger.info(f"{tag}Iter {iteration}: reheat #{reheats} from best_score={best_score}, temp={t_start:.1f}")
+
+    if checkpoint:
+        save()
+    selector.log_summary(tag)
+    return best_placement, best_score, iteration
+
+# Per-process state for anneal_parallel workers, set once by _init_worker
+_worker_state = {}
+
+def _init_worker(sessions, subjects, student_weights, stop_event):
+    _worker_state.update(
+        sessions=sessions, subjects=subjects,
+        student_weights=student_weights, stop_event=stop_event
+    )
+
+def _search_worker(worker_id, seed, placement, time_limit, engine="sa", warm=False):
+    """Run one seeded search chain from `placement` in a worker process."""
+    random.seed(seed)
+    subjects = _worker_state['subjects']
+    stop_event = _worker_state['stop_event']
+    current = Timetable(_worker_state['sessions'], placement)
+    evaluator = IncrementalEvaluator(current, subjects, _worker_state['student_weights'])
+    selector = OperatorSelector()
+    trace = []
+    start = time.time()
+    best_placement, best_score, iterations = SEARCH_ENGINES[engine](
+        current, evaluator, subjects, time_limit,
+        stop_flag=stop_event.is_set, tag=f"[worker {worker_id}] ", selector=selector, trace=trace,
+        **({'warm': True} if warm and engine == "sa" else {})
+    )
+    return best_placement, {
+        'worker': worker_id, 'seed': seed, 'iterations': iterations,
+        'best_score': best_score, 'elapsed': time.time() - start,
+        'operators': selector.summary(), 'trace': trace
+    }
+
+def _tempering_sweep(placement, temp, steps, seed, selector):
+    """
+    Run `steps` fixed-temperature moves from `placement` in a worker process.
+    The replica's OperatorSelector travels with it and is returned updated.
+    """
+    random.seed(seed)
+    subjects = _worker_state['subjects']
+    current = Timetable(_worker_state['sessions'], placement)
+    evaluator = IncrementalEvaluator(current, subjects, _worker_state['student_weights'])
+    current_score = evaluator.score
+    best_placement, best_score = placement, current_score
+    accepted = 0
+    for _ in range(steps):
+        current_score, ok = metropolis_step(current, evaluator, subjects, current_score, temp, selector)
+        if ok:
+            accepted += 1
+            if current_score < best_score:
+                best_placement, best_score = current.snapshot(), current_score
+    return current.snapshot(), current_score, best_placement, best_score, accepted, selector
+
+def temperature_ladder(replicas, t_max, t_min=None):
+    """
+    Geometric temperatures from t_min (coldest, PT_MIN_TEMP_RATIO of t_max
+    by default) to t_max (hottest).
+    """
+    if t_min is None:
+        t_min = t_max * PT_MIN_TEMP_RATIO
+    if replicas == 1:
+        return [t_min]
+    ratio = (t_max / t_min) ** (1 / (replicas - 1))
+    return [t_min * ratio ** k for k in range(replicas)]
+
+def parallel_tempering(sessions, subjects, placement, time_limit, replicas=PT_REPLICAS,
+                       stop_flag=None, student_weights=None, temps=None, trace=None):
+    """
+    Replica exchange: `replicas` copies of the schedule run fixed-temperature
+    Metropolis sweeps in a process pool at a geometric temperature ladder,
+    topped by the instance's calibrated SA starting temperature (see
+    calibrate_temperature) unless `temps` is given.
+    After each sweep, neighbouring replicas swap states with the usual
+    exchange probability, so good states drift to the cold end while hot
+    replicas keep exploring. Every new best is appended to `trace` as
+    (seconds, score).
+    Returns (best_placement, best_score, per-replica stats).
+    """
+    start_time = time.time()
+    if not temps:
+        current = Timetable(sessions, placement)
+        evaluator = IncrementalEvaluator(current, subjects, student_weights)
+        temps = temperature_ladder(replicas, calibrate_temperature(current, evaluator, subjects))
+        logger.info(f"Temperature ladder: {', '.join(f'{t:.0f}' for t in temps)}")
+    replicas = len(temps)
+    states = [placement] * replicas
+    scores = [None] * replicas
+    best_placement, best_score = placement, float('inf')
+    replica_stats = [
+        {'replica': k, 'temp': t, 'iterations': 0, 'accepted': 0, 'swaps_tried': 0, 'swaps_accepted': 0}
+        for k, t in enumerate(temps)
+    ]
+    selectors = [OperatorSelector() for _ in temps]  # per temperature, not per state
+    rounds = 0
+    with ProcessPoolExecutor(max_workers=replicas, initializer=_init_worker,
+                             initargs=(sessions, subjects, student_weights, None)) as pool:
+        while time.time() - start_time < time_limit * 0.95:
+            if stop_flag and stop_flag():
+                break
+            futures = [
+                pool.submit(_tempering_sweep, states[k], temps[k], PT_SWEEP_STEPS,
+                            random.randrange(2**32), selectors[k])
+                for k in range(replicas)
+            ]
+            for k, fut in enumerate(futures):
+                states[k], scores[k], sweep_best, sweep_best_score, accepted, selectors[k] = fut.result()
+                replica_stats[k]['iterations'] += PT_SWEEP_STEPS
+                replica_stats[k]['accepted'] += accepted
+                if sweep_best_score < best_score:
+                    best_placement, best_score = sweep_best, sweep_best_score
+                    logger.info(f"Round {rounds}: New best score = {best_score} (T={temps[k]:.0f})")
+                    if trace is not None:
+                        trace.append((time.time() - start_time, best_score))
+
+            # Exchange neighbouring replicas, alternating even and odd pairs
+            for k in range(rounds % 2, replicas - 1, 2):
+                replica_stats[k]['swaps_tried'] += 1
+                d = (1 / temps[k] - 1 / temps[k + 1]) * (scores[k] - scores[k + 1])
+                if d >= 0 or random.random() < math.exp(d):
+                    states[k], states[k + 1] = states[k + 1], states[k]
+                    scores[k], scores[k + 1] = scores[k + 1], scores[k]
+                    replica_stats[k]['swaps_accepted'] += 1
+            rounds += 1
+            if rounds % 10 == 0:
+                logger.info(f"Round {rounds}, best_score={best_score}, replica scores={scores}")
+    for k, selector in enumerate(selectors):
+        replica_stats[k]['operators'] = selector.summary()
+        selector.log_summary(f"[T={temps[k]:.0f}] ")
+    return best_placement, best_score, replica_stats
+
+def search_parallel(sessions, subjects, placement, time_limit, workers,
+                    stop_flag=None, student_weights=None, seeds=None, engine="sa", warm=False):
+    """
+    Run `workers` independent search chains (SEARCH_ENGINES[engine]) from
+    `placement` in a process pool. The session catalog is sent to each process once. `stop_flag` is
+    polled here and forwarded to the workers. `warm` is passed on to
+    annealing chains (see anneal).
+    Returns (best_placement, best_score, per-worker stats).
+    """
+    if seeds is None:
+        seeds = [random.randrange(2**32) for _ in range(workers)]
+    ctx = multiprocessing.get_context()
+    stop_event = ctx.Event()
+    best_placement, best_score = placement, float('inf')
+    worker_stats = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(sessions, subjects, student_weights, stop_event)) as pool:
+        pending = {
+            pool.submit(_search_worker, i, seed, placement, time_limit, engine, warm)
+            for i, seed in enumerate(seeds)
+        }
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if stop_flag and stop_flag():
+                stop_event.set()
+            for fut in done:
+                try:
+                    chain_placement, chain_stats = fut.result()
+                except Exception as e:
+                    logger.error(f"Search worker failed: {e}")
+                    continue
+                worker_stats.append(chain_stats)
+                logger.info(f"Worker {chain_stats['worker']} finished: best_score={chain_stats['best_score']}, "
+                            f"iterations={chain_stats['iterations']}")
+                if chain_stats['best_score'] < best_score:
+                    best_placement, best_score = chain_placement, chain_stats['best_score']
+    worker_stats.sort(key=lambda st: st['worker'])
+    return best_placement, best_score, worker_stats
+
+# --- Tabu Search ---
+def tabu_search(current, evaluator, subjects, time_limit, stop_flag=None, tag="", selector=None,
+                trace=None):
+    """
+    Tabu search on `current` (modified in place) for at most `time_limit`
+    seconds. Each step samples TABU_SAMPLE_SIZE relocation/swap neighbours
+    and takes the best one that does not put a session back on a start it
+    left within the last TABU_TENURE steps, unless it beats the best score
+    so far (aspiration). The sample is drawn through `selector`, and every
+    new best is appended to `trace` as (seconds, score).
+    Returns (best_placement, best_score, iterations).
+    """
+    selector = selector or OperatorSelector()
+    start_time = time.time()
+    operators = [move_session_to_empty_slot, swap_two_sessions]
+    current_score = evaluator.score
+    best_placement = current.snapshot()
+    best_score = current_score
+    if trace is not None:
+        trace.append((0.0, best_score))
+    tabu = {}  # (session index, start) -> last step it is forbidden
+    iteration = 0
+    stall_count = 0
+    last_log_time = start_time
+
+    while time.time() - start_time < time_limit * 0.95:
+        if stop_flag and stop_flag():
             break
+        iteration += 1
 
-        temp *= cooling_rate
+        # Sample the neighbourhood, keeping the best admissible move
+        chosen, chosen_score = None, None
+        sampled = []
+        for _ in range(TABU_SAMPLE_SIZE):
+            moves = []
+            generate_neighbor(current, subjects, moves, operators, selector)
+            if not moves:
+                continue
+            score = evaluator.apply(moves)
+            undo_moves(current, moves)
+            evaluator.revert(moves)
+            sampled.append((selector.last, moves, score))
+            if chosen is not None and score >= chosen_score:
+                continue
+            is_tabu = any(tabu.get((sess.index, new), 0) >= iteration for sess, _, new in moves)
+            if not is_tabu or score < best_score:
+                chosen, chosen_score = moves, score
+        for name, moves, score in sampled:
+            selector.record_outcome(name, moves is chosen, current_score - score)
+
+        if chosen is not None:
+            redo_moves(current, chosen)
+            current_score = evaluator.apply(chosen)
+            for sess, old_start, _ in chosen:
+                if old_start is not None:
+                    tabu[(sess.index, old_start)] = iteration + TABU_TENURE
+
+        if current_score < best_score:
+            best_score = current_score
+            best_placement = current.snapshot()
+            logger.info(f"{tag}Step {iteration}: New best score = {best_score}")
+            if trace is not None:
+                trace.append((time.time() - start_time, best_score))
+            stall_count = 0
+        else:
+            stall_count += 1
 
-    # Load the subject-student mapping for splitting parallel sessions
-    subj_students = {}
-    for row in get_subject_student():
-        subject_ids = json.loads(row[1])
-        student_id = row[3]
-        for sid in subject_ids:
-            subj_students.setdefault(sid, set()).add(student_id)
+        if iteration % 100 == 0:
+            tabu = {key: until for key, until in tabu.items() if until >= iteration}
+        current_time = time.time()
+        if current_time - last_log_time > 30:
+            logger.info(f"{tag}Step {iteration}, best_score={best_score}, current_score={current_score}")
+            last_log_time = current_time
+        if stall_count >= TABU_STALL_STEPS:
+            logger.error(f"{tag}No improvement for too long, stopping.")
+            break
 
-    # Now split the parallel sessions in the best schedule
-    logger.info("Splitting parallel subject groups...")
-    best_schedule = split_parallel_sessions(best_schedule, subjects, subj_students)
-    
-    # 5) Build students_dict for output
-    students_dict = {
-        s[0]: {'id': s[0], 'name': f"{s[1]} {s[2] or ''} {s[3]}".strip()}
-        for s in get_student()
-    }
-    return best_schedule, students_dict
+    selector.log_summary(tag)
+    return best_placement, best_score, iteration
+
+# --- Large Neighbourhood Search ---
+def destroy_same_day(schedule, seed):
+    """Placed sessions starting on the seed session's day."""
+    day = schedule.start_of(seed)[0]
+    return [s for s in schedule.sessions if (schedule.start_of(s) or (None,))[0] == day]
+
+def destroy_same_teacher(schedule, seed):
+    """Placed sessions sharing a teacher with the seed session."""
+    tids = {tid for tid in seed.teachers if tid is not None}
+    return [s for s in schedule.sessions
+            if schedule.start_of(s) is not None and tids.intersection(s.teachers)]
+
+def destroy_same_cohort(schedule, seed):
+    """Placed sessions sharing a student cohort with the seed session."""
+    related = seed.student_conflicts
+    return [s for s in schedule.sessions
+            if related >> s.index & 1 and schedule.start_of(s) is not None]
+
+def destroy_same_subject(schedule, seed):
+    """Placed sessions of the seed session's subject, across all groups."""
+    return [s for s in schedule.sessions
+            if s.subject == seed.subject and schedule.start_of(s) is not None]
+
+DESTROY_HEURISTICS = [destroy_same_day, destroy_same_teacher, destroy_same_cohort, destroy_same_subject]
+
+def lns_search(current, evaluator, subjects, time_limit, stop_flag=None, tag="", selector=None,
+               trace=None):
+    """
+    Large neighbourhood search on `current` (modified in place) for at most
+    `time_limit` seconds. Each round unplaces a related subset of sessions
+    (same day, teacher, cohort or subject) and re-inserts them with the
+    greedy_initial repair; the round is kept only if the score improves.
+    Destroy heuristics are picked by `selector` from their recent success,
+    and the destroyed share grows while rounds keep failing. Every new best
+    is appended to `trace` as (seconds, score).
+    Returns (best_placement, best_score, iterations).
+    """
+    selector = selector or OperatorSelector()
+    start_time = time.time()
+    sessions = current.sessions
+    current_score = evaluator.score
+    best_placement = current.snapshot()
+    best_score = current_score
+    if trace is not None:
+        trace.append((0.0, best_score))
+    fraction = LNS_MIN_FRACTION
+    iteration = 0
+    stall_count = 0
+    last_log_time = start_time
+
+    while time.time() - start_time < time_limit * 0.95:
+        if stop_flag and stop_flag():
+            break
+        placed = [s for s in sessions if current.start_of(s) is not None]
+        if not placed:
+            break
+        iteration += 1
+
+        # Destroy: unplace a related subset around a random seed session
+        round_start = time.perf_counter()
+        destroy = selector.choose(DESTROY_HEURISTICS)
+        seed = random.choice(placed)
+        related = [s for s in destroy(current, seed) if s is not seed]
+        size = max(2, round(fraction * len(placed)))
+        victims = [seed] + random.sample(related, min(size - 1, len(related)))
+        moves = []
+        for sess in victims:
+            relocate_session(current, sess, None, moves)
+
+        # Repair: greedy re-insertion, journaled as placement changes
+        before = current.snapshot()
+        greedy_initial(sessions, subjects, evaluator.student_weights, schedule=current)
+        for i, (old, new) in enumerate(zip(before, current.placement)):
+            if old != new:
+                moves.append((sessions[i], None, SLOT_COORDS[new]))
+        new_score = evaluator.apply(moves)
+        selector.record_proposal(destroy.__name__, time.perf_counter() - round_start, True)
+        selector.record_outcome(destroy.__name__, new_score < current_score, current_score - new_score)
+
+        if new_score < current_score:
+            current_score = new_score
+            fraction = max(LNS_MIN_FRACTION, fraction * 0.9)
+        else:
+            undo_moves(current, moves)
+            evaluator.revert(moves)
+            fraction = min(LNS_MAX_FRACTION, fraction * 1.02)
+
+        if current_score < best_score:
+            best_score = current_score
+            best_placement = current.snapshot()
+            logger.info(f"{tag}Round {iteration}: New best score = {best_score}")
+            if trace is not None:
+                trace.append((time.time() - start_time, best_score))
+            stall_count = 0
+        else:
+            stall_count += 1
+
+        current_time = time.time()
+        if current_time - last_log_time > 30:
+            logger.info(f"{tag}Round {iteration}, best_score={best_score}, destroy fraction={fraction:.2f}")
+            last_log_time = current_time
+        if stall_count >= LNS_STALL_ROUNDS:
+            logger.error(f"{tag}No improvement for too long, stopping.")
+            break
+
+    selector.log_summary(tag)
+    return best_placement, best_score, iteration
+
+SEARCH_ENGINES = {"sa": anneal, "tabu": tabu_search, "lns": lns_search}
+
+# --- Minimal-Perturbation Repair ---
+def displacement_delta(moves, anchors):
+    """Change in the number of sessions off their `anchors` start caused by a move journal."""
+    first, last = {}, {}
+    for sess, old_start, new_start in moves:
+        first.setdefault(sess.index, old_start)
+        last[sess.index] = new_start
+    delta = 0
+    for i, old_start in first.items():
+        anchor = anchors[i]
+        if anchor < 0:
+            continue
+        was_off = old_start is None or old_start[0] * PERIODS_PER_DAY + old_start[1] != anchor
+        now_off = last[i] is None or last[i][0] * PERIODS_PER_DAY + last[i][1] != anchor
+        delta += now_off - was_off
+    return delta
+
+def displacement_penalty(current, evaluator, subjects):
+    """
+    Cost of a lesson off its previous slot in repair_search: REPAIR_DISPLACEMENT_RATIO
+    times the largest score change of a sampled move, so that moving a lesson
+    only pays when it fixes more than the neighbourhood normally trades.
+    """
+    deltas = sample_deltas(current, evaluator, subjects)
+    return REPAIR_DISPLACEMENT_RATIO * max((abs(delta) for delta in deltas), default=1.0)
+
+def repair_search(current, evaluator, subjects, anchors, time_limit, stop_flag=None, tag="",
+                  selector=None, trace=None):
+    """
+    Minimal-perturbation local search on `current` (modified in place).
+    The objective is the evaluator score plus displacement_penalty for
+    every session away from its `anchors` start (a placement vector; -1
+    means the session has no previous slot and moves freely). Moves that
+    do not raise the objective are kept, so lessons only leave their old
+    slots when that pays for itself. Stops after REPAIR_STALL_STEPS steps
+    without improvement. Every new best is appended to `trace`.
+    Returns (best_placement, best_score, iterations); best_score is the
+    plain evaluator score of the best placement.
+    """
+    selector = selector or OperatorSelector()
+    start_time = time.time()
+    penalty = displacement_penalty(current, evaluator, subjects)
+    logger.info(f"{tag}Repair: displacement penalty {penalty:.0f} per moved lesson")
+    current_score = evaluator.score
+    displaced = sum(anchor >= 0 and start != anchor for anchor, start in zip(anchors, current.placement))
+    # Costs are rebuilt from the score rather than accumulated, which would turn an inf start into nan
+    current_cost = current_score + penalty * displaced
+    best_placement = current.snapshot()
+    best_score, best_cost = current_score, current_cost
+    if trace is not None:
+        trace.append((0.0, best_score))
+    iteration = 0
+    stall_count = 0
+
+    while time.time() - start_time < time_limit * 0.95 and stall_count < REPAIR_STALL_STEPS:
+        if stop_flag and stop_flag():
+            break
+        iteration += 1
+        moves = []
+        generate_neighbor(current, subjects, moves, selector=selector)
+        if not moves:
+            stall_count += 1
+            continue
+        new_score = evaluator.apply(moves)
+        new_displaced = displaced + displacement_delta(moves, anchors)
+        new_cost = new_score + penalty * new_displaced
+        accepted = new_cost <= current_cost
+        gain = current_cost - new_cost
+        selector.record_outcome(selector.last, accepted, gain if math.isfinite(gain) else 0)
+        if not accepted:
+            undo_moves(current, moves)
+            evaluator.revert(moves)
+            stall_count += 1
+            continue
+        current_score, displaced, current_cost = new_score, new_displaced, new_cost
+        if current_cost < best_cost:
+            best_cost, best_score = current_cost, current_score
+            best_placement = current.snapshot()
+            if trace is not None:
+                trace.append((time.time() - start_time, best_score))
+            stall_count = 0
+        else:
+            stall_count += 1
+
+    moved = sum(anchor >= 0 and start != anchor for anchor, start in zip(anchors, best_placement))
+    logger.info(f"{tag}Repair: best_score={best_score}, {moved} lessons moved off their previous slots")
+    selector.log_summary(tag)
+    return best_placement, best_score, iteration
+
+def is_candidate(sess, day, period):
+    """Whether `sess` may start at (day, period): inside its teachers' windows and the hour blocker."""
+    return day * PERIODS_PER_DAY + period in sess.candidates
 
 def has_teacher_conflict(sess, day, period, schedule):
     """
     Check if placing session 'sess' at (day, period) would create 
-    a teacher conflict with any existing sessions.
+    a teacher conflict with any existing sessions in the Timetable.
     Returns True if there would be a conflict (teacher has 2+ groups).
     """
-    bs = sess.get('block_size', 1)
+    bs = sess.block_size
     
     for offset in range(bs):
         target_slot = (day, period + offset)
-        if target_slot in schedule:
-            for existing_sess in schedule[target_slot]:
-                # Skip comparing with self (for swap operations)
-                if existing_sess.get('id') == sess.get('id'):
-                    continue
-                
-                # Check for any common teachers - that would be a conflict
-                for tid in sess['teachers']:
-                    if tid in existing_sess['teachers']:
-                        return True
+        if target_slot not in schedule:
+            continue
+        idx = day * PERIODS_PER_DAY + period + offset
+        # Skip the session's own entry (for swap operations)
+        own = any(existing_sess is sess for existing_sess in schedule[target_slot])
+        for tid in sess.teachers:
+            row = schedule.teacher_occ.get(tid)
+            if row is not None and row[idx] > own:
+                return True
                         
     return False
 
@@ -926,20 +2504,21 @@ def count_placed_hours(schedule):
     placed = defaultdict(int)
     for (_, _), slot in schedule.items():
         for sess in slot:
-            placed[sess['subject']] += 1
+            placed[sess.subject] += 1
     return placed
 
-def fallback_replace_blocks_with_all_singles(all_sessions, placed_schedule, subjects, teachers, hour_blocker):
+def fallback_replace_blocks_with_all_singles(all_sessions, placed_schedule, subjects, teachers, hour_blocker,
+                                             also=()):
     """
     Replace only those (subject, group) combos that missed required hours
-    with single-hour sessions tagged to their group.
+    (and those in `also`) with single-hour sessions tagged to their group.
     """
     placed_counts = count_placed_hours_per_group(placed_schedule)
     missing = []
     for sid, subj in subjects.items():
         req = subj[3]
         for grp in range(1, subj[2] + 1):
-            if placed_counts[sid].get(grp, 0) < req:
+            if placed_counts[sid].get(grp, 0) < req or (sid, grp) in also:
                 missing.append((sid, grp))
     if not missing:
         return all_sessions
@@ -951,16 +2530,20 @@ def fallback_replace_blocks_with_all_singles(all_sessions, placed_schedule, subj
 
     new_sessions = [
         s for s in all_sessions
-        if (s['subject'], s['group']) not in missing
+        if (s.subject, s.group) not in missing
     ]
     for sid, grp in missing:
         req = subjects[sid][3]
         teachers_list = subject_teachers.get(sid, [])
         all_students = next(
-            (s['students'] for s in all_sessions
-             if s['subject']==sid and s['group']==grp),
+            (s.students for s in all_sessions
+             if s.subject==sid and s.group==grp),
             []
         )
+        if not all_students:
+            # Groups 2+ of parallel subjects and groups left empty by the split have no
+            # lessons of their own; singles for them would only hold teachers
+            continue
         maxpd = subjects[sid][4]
         for h in range(req):
             if not teachers_list:
@@ -978,17 +2561,51 @@ def fallback_replace_blocks_with_all_singles(all_sessions, placed_schedule, subj
                 subjects_dict=subjects,
                 parallel_group=None
             )
-            single['group'] = grp
+            single.group = grp
             new_sessions.append(single)
-    return new_sessions
+    return index_sessions(new_sessions)
 
 
-def generate_neighbor(schedule, subjects):
+def relocate_session(schedule, sess, new_start, moves=None):
+    """
+    Move `sess` to `new_start` (None to unplace it) in the Timetable, in
+    place, and record (session, old_start, new_start) in the `moves` journal.
     """
-    Generate a neighbor state from the current schedule.
+    old_start = schedule.start_of(sess)
+    if old_start is not None:
+        schedule.remove(sess)
+    if new_start is not None:
+        schedule.place(sess, new_start)
+    if moves is not None:
+        moves.append((sess, old_start, new_start))
+
+def undo_moves(schedule, moves):
+    """Roll `schedule` back over a journal recorded by the move operators."""
+    for sess, old_start, _ in reversed(moves):
+        relocate_session(schedule, sess, old_start)
+
+def jump_to_placement(schedule, placement, moves=None):
+    """Relocate every session whose start differs from `placement`, journaling the moves."""
+    for sess, target in zip(schedule.sessions, placement):
+        if schedule.placement[sess.index] != target:
+            relocate_session(schedule, sess, SLOT_COORDS[target] if target >= 0 else None, moves)
+
+def redo_moves(schedule, moves):
+    """Replay a journal on the state it was recorded from."""
+    for sess, _, new_start in moves:
+        relocate_session(schedule, sess, new_start)
+
+def generate_neighbor(schedule, subjects, moves=None, operators=None, selector=None):
+    """
+    Turn `schedule` into a neighbor state, in place.
     Ensures that teachers are never assigned to multiple groups at the same time.
+    The (session, old_start, new_start) journal of the applied move is
+    appended to `moves`; pass it to undo_moves to reject the neighbor.
+    `operators` restricts the move operators to choose from. With an
+    OperatorSelector, the operator is picked by its adaptive weights and
+    each attempt's cost is recorded.
     """
-    moves = [
+    operators = operators or [
         move_session_to_empty_slot,
         swap_two_sessions,
         move_parallel_group,
@@ -997,76 +2614,43 @@ def generate_neighbor(schedule, subjects):
     
     # Try up to 10 times to generate a valid neighbor
     for _ in range(10):
-        move = random.choice(moves)
-        neighbor = copy.deepcopy(schedule)
-        neighbor = move(neighbor, subjects)
-        
-        # Validate: check that no teacher has multiple groups at the same time
-        teacher_timeslots = {}  # (tid, day, period) -> session_id
-        has_conflicts = False
+        move = selector.choose(operators) if selector else random.choice(operators)
+        attempt_moves = []
+        started = time.perf_counter()
+        neighbor = move(schedule, subjects, attempt_moves)
         
-        for (day, period), sessions_here in neighbor.items():
-            for sess in sessions_here:
-                for tid in sess['teachers']:
-                    key = (tid, day, period)
-                    if key in teacher_timeslots:
-                        has_conflicts = True
-                        break
-                    teacher_timeslots[key] = sess['id']
-                if has_conflicts:
-                    break
-            if has_conflicts:
-                break
-                
-        if not has_conflicts:
+        # Validate: an actual change, and no teacher with multiple groups at the same time
+        noop = not attempt_moves
+        conflict = not noop and bool(neighbor.teacher_clashes)
+        valid = not noop and not conflict
+        if selector:
+            selector.record_proposal(move.__name__, time.perf_counter() - started, valid, noop, conflict)
+        if valid:
+            if moves is not None:
+                moves.extend(attempt_moves)
             return neighbor
+        undo_moves(schedule, attempt_moves)
     
-    # If all attempts failed, return a copy of the original schedule
-    return copy.deepcopy(schedule)
-
-def _compute_subject_daily(schedule, sid):
-    counts = defaultdict(int)
-    for (d, p), sl in schedule.items():
-        for sess in sl:
-            if sess['subject']==sid:
-                counts[d]+=1
-    return counts
+    # If all attempts failed, return the original schedule unchanged
+    return schedule
 
 def has_student_conflict(sess, key, schedule):
-    if key not in schedule:
-        return False
-    sset = set(sess['students'])
-    for other in schedule[key]:
-        if sset & set(other['students']):
-            return True
-    return False
+    return bool(sess.student_conflicts & schedule.slot_members[key[0] * PERIODS_PER_DAY + key[1]])
 
-# --- Move Heuristics (unchanged) ---
-def move_session_to_empty_slot(schedule, subjects):
+# --- Move Heuristics ---
+def move_session_to_empty_slot(schedule, subjects, moves=None):
     occupied = list(schedule.keys())
     if not occupied:
         return schedule
     
-    teacher_sched = defaultdict(set)
-    
-    for (d,p), sl in schedule.items():
-        idx = d*PERIODS_PER_DAY + p
-        for sess in sl:
-            for tid in sess['teachers']:
-                teacher_sched[tid].add(idx)
-
-    loads = defaultdict(lambda: defaultdict(int))
-    for (d,p), sl in schedule.items():
-        for sess in sl:
-            for tid in sess['teachers']:
-                loads[tid][d]+=1
+    loads = {tid: [schedule.teacher_load(tid, d) for d in range(4)] for tid in schedule.teacher_occ}
 
     slot_scores = []
     for slot in occupied:
         day = slot[0]
         max_load=0
         for sess in schedule[slot]:
-            for tid in sess['teachers']:
+            for tid in sess.teachers:
                 max_load=max(max_load, loads[tid][day])
         slot_scores.append((max_load,slot))
     source = max(slot_scores,key=lambda x:x[0])[1]
@@ -1074,17 +2658,15 @@ def move_session_to_empty_slot(schedule, subjects):
         return schedule
 
     session = random.choice(schedule[source])
-    sid=session['subject']
-    maxpd=session['max_per_day']
-    bs=session.get('block_size',1)
-    orig_daily=_compute_subject_daily(schedule,sid)
+    maxpd=session.max_per_day
+    bs=session.block_size
 
     target=[]
     for d in range(4):
         for p in range(PERIODS_PER_DAY-bs+1):
             if (d,p)==source: continue
             if len(schedule.get((d,p),[])) < len(schedule[source]):
-                day_load=sum(loads[tid][d] for sess2 in schedule.get((d,p),[]) for tid in sess2['teachers'])
+                day_load=sum(loads[tid][d] for sess2 in schedule.get((d,p),[]) for tid in sess2.teachers)
                 target.append((day_load,(d,p)))
 
     if not target:
@@ -1093,10 +2675,8 @@ def move_session_to_empty_slot(schedule, subjects):
     target.sort(key=lambda x:(x[0],x[1][0],x[1][1],len(schedule.get(x[1],[]))))
     for _,(nd,np) in target:
         if np+bs-1>=PERIODS_PER_DAY: continue
-        newd=orig_daily.copy()
-        oldd=source[0]
-        newd[oldd]-=bs; newd[nd]+=bs
-        if newd[nd]>maxpd: continue
+        if not is_candidate(session,nd,np): continue
+        if schedule.day_load_after_move(session,nd)>maxpd: continue
 
         # Use our new teacher conflict check function
         if has_teacher_conflict(session, nd, np, schedule):
@@ -1112,19 +2692,12 @@ def move_session_to_empty_slot(schedule, subjects):
             continue
 
         # Execute the move
-        old_slots=[k for k,v in schedule.items() if session in v]
-        for os in old_slots:
-            schedule[os].remove(session)
-            if not schedule[os]:
-                del schedule[os]
-        for off in range(bs):
-            slot=(nd,np+off)
-            schedule.setdefault(slot,[]).append(session)
+        relocate_session(schedule,session,(nd,np),moves)
         return schedule
 
     return schedule
 
-def swap_two_sessions(schedule, subjects):
+def swap_two_sessions(schedule, subjects, moves=None):
     occupied=list(schedule.keys())
     if len(occupied)<2: return schedule
     
@@ -1133,124 +2706,73 @@ def swap_two_sessions(schedule, subjects):
 
     sess1=random.choice(schedule[s1])
     sess2=random.choice(schedule[s2])
-    sid1,sid2=sess1['subject'],sess2['subject']
-    maxpd1,maxpd2=sess1['max_per_day'],sess2['max_per_day']
-    bs1,bs2=sess1.get('block_size',1),sess2.get('block_size',1)
-    d1,p1=s1; d2,p2=s2
-
-    daily1,daily2 = _compute_subject_daily(schedule,sid1),_compute_subject_daily(schedule,sid2)
-    nd1=daily1.copy(); nd2=daily2.copy()
-    nd1[d1]-=bs1; nd1[d2]+=bs1
-    nd2[d2]-=bs2; nd2[d1]+=bs2
-    if nd1[d2]>maxpd1 or nd2[d1]>maxpd2: return schedule
-
-    # Create temporary schedules for conflict checking
-    test_schedule1 = copy.deepcopy(schedule)
-    test_schedule2 = copy.deepcopy(schedule)
-    
-    # Remove sess1 from its slots in test_schedule1
-    for slot in [s1]:
-        for off in range(bs1):
-            test_slot = (slot[0], slot[1] + off)
-            if test_slot in test_schedule1:
-                if sess1 in test_schedule1[test_slot]:
-                    test_schedule1[test_slot].remove(sess1)
-                    
-    # Remove sess2 from its slots in test_schedule2
-    for slot in [s2]:
-        for off in range(bs2):
-            test_slot = (slot[0], slot[1] + off)
-            if test_slot in test_schedule2:
-                if sess2 in test_schedule2[test_slot]:
-                    test_schedule2[test_slot].remove(sess2)
-    
-    # Check if sess1 can go to sess2's position without teacher conflicts
-    if has_teacher_conflict(sess1, d2, p2, test_schedule1):
+    if sess1 is sess2: return schedule
+    maxpd1,maxpd2=sess1.max_per_day,sess2.max_per_day
+    bs1,bs2=sess1.block_size,sess2.block_size
+    d1,p1=schedule.start_of(sess1); d2,p2=schedule.start_of(sess2)
+    if p2+bs1>PERIODS_PER_DAY or p1+bs2>PERIODS_PER_DAY: return schedule
+    if not is_candidate(sess1,d2,p2) or not is_candidate(sess2,d1,p1): return schedule
+
+    if schedule.day_load_after_move(sess1,d2)>maxpd1: return schedule
+    if schedule.day_load_after_move(sess2,d1)>maxpd2: return schedule
+
+    # Check each session against the other's position with both lifted out,
+    # so a shared teacher or student between the pair does not block the swap
+    schedule.remove(sess1)
+    schedule.remove(sess2)
+    ok = (not has_teacher_conflict(sess1, d2, p2, schedule)
+          and not any(has_student_conflict(sess1,(d2,p2+off),schedule) for off in range(bs1)))
+    if ok:
+        schedule.place(sess1,(d2,p2))
+        ok = (not has_teacher_conflict(sess2, d1, p1, schedule)
+              and not any(has_student_conflict(sess2,(d1,p1+off),schedule) for off in range(bs2)))
+        schedule.remove(sess1)
+    schedule.place(sess1,(d1,p1))
+    schedule.place(sess2,(d2,p2))
+    if not ok:
         return schedule
-        
-    # Check if sess2 can go to sess1's position without teacher conflicts
-    if has_teacher_conflict(sess2, d1, p1, test_schedule2):
-        return schedule
-
-    # Student conflict checks remain the same
-    for off in range(bs1):
-        if has_student_conflict(sess1,(d2,p2+off),schedule): return schedule
-    for off in range(bs2):
-        if has_student_conflict(sess2,(d1,p1+off),schedule): return schedule
 
     # Execute swap
-    old1=[k for k,v in schedule.items() if sess1 in v]
-    old2=[k for k,v in schedule.items() if sess2 in v]
-    for o in old1:
-        schedule[o].remove(sess1)
-        if not schedule[o]: del schedule[o]
-    for o in old2:
-        schedule[o].remove(sess2)
-        if not schedule[o]: del schedule[o]
-    for o in old2:
-        schedule.setdefault(o,[]).append(sess1)
-    for o in old1:
-        schedule.setdefault(o,[]).append(sess2)
+    relocate_session(schedule,sess1,(d2,p2),moves)
+    relocate_session(schedule,sess2,(d1,p1),moves)
     return schedule
 
-def move_parallel_group(schedule, subjects):
-    teacher_sched=defaultdict(set)
-    for (d,p),sl in schedule.items():
-        idx=d*PERIODS_PER_DAY+p
-        for sess in sl:
-            for tid in sess['teachers']:
-                teacher_sched[tid].add(idx)
-
+def move_parallel_group(schedule, subjects, moves=None):
     parallel_groups=defaultdict(list)
     for slot,sl in schedule.items():
         for sess in sl:
-            if sess.get('is_parallel'):
-                parallel_groups[sess['parallel_with']].append((slot,sess))
+            if sess.is_parallel and slot==schedule.start_of(sess):
+                parallel_groups[sess.parallel_with].append((slot,sess))
     if not parallel_groups:
         return schedule
 
     group_id=random.choice(list(parallel_groups.keys()))
     group_sessions=parallel_groups[group_id]
     target_day=random.randint(0,3)
-    max_block=max(sess.get('block_size',1) for _,sess in group_sessions)
+    max_block=max(sess.block_size for _,sess in group_sessions)
     target_p=random.randint(0,PERIODS_PER_DAY-max_block)
 
-    daily_counts={}
-    for _,sess in group_sessions:
-        sid=sess['subject']
-        daily_counts[sid]=_compute_subject_daily(schedule,sid)
-
     for old_slot,sess in group_sessions:
-        sid=sess['subject']
-        maxpd=sess['max_per_day']
-        bs=sess.get('block_size',1)
-        old_day=old_slot[0]
-        new_daily=daily_counts[sid].copy()
-        new_daily[old_day]-=bs; new_daily[target_day]+=bs
-        if new_daily[target_day]>maxpd: return schedule
+        maxpd=sess.max_per_day
+        bs=sess.block_size
+        if not is_candidate(sess,target_day,target_p): return schedule
+        if schedule.day_load_after_move(sess,target_day)>maxpd: return schedule
 
         for off in range(bs):
             idx=target_day*PERIODS_PER_DAY+(target_p+off)
-            for tid in sess['teachers']:
-                if idx in teacher_sched[tid]: return schedule
+            for tid in sess.teachers:
+                row=schedule.teacher_occ.get(tid)
+                if row is not None and row[idx]: return schedule
         for off in range(bs):
             if has_student_conflict(sess,(target_day,target_p+off),schedule):
                 return schedule
 
     # commit
-    for old_slot,sess in group_sessions:
-        olds=[k for k,v in schedule.items() if sess in v]
-        for o in olds:
-            schedule[o].remove(sess)
-            if not schedule[o]: del schedule[o]
     for _,sess in group_sessions:
-        bs=sess.get('block_size',1)
-        for off in range(bs):
-            slot=(target_day,target_p+off)
-            schedule.setdefault(slot,[]).append(sess)
+        relocate_session(schedule,sess,(target_day,target_p),moves)
     return schedule
 
-def reorganize_day(schedule, subjects):
+def reorganize_day(schedule, subjects, moves=None):
     day=random.randint(0,3)
     original=[]
     for p in range(PERIODS_PER_DAY):
@@ -1258,71 +2780,75 @@ def reorganize_day(schedule, subjects):
         if slot in schedule:
             for sess in schedule[slot]:
                 original.append((p,sess))
-            del schedule[slot]
     if not original:
         return schedule
 
-    day_sessions=[]; seen=set()
+    day_sessions=[]; old_starts={}
     for _,sess in original:
-        if sess['id'] not in seen:
-            seen.add(sess['id'])
+        if sess.index not in old_starts:
+            old_starts[sess.index]=schedule.start_of(sess)
             day_sessions.append(sess)
+    for sess in day_sessions:
+        schedule.remove(sess)
+    moved=list(day_sessions)
 
-    day_sessions.sort(key=lambda s:(len(s['students']),s['subject']))
-    placed={}
+    day_sessions.sort(key=lambda s:(len(s.students),s.subject))
+    placed=[0]*PERIODS_PER_DAY; starts=[]
     idx=0
     while day_sessions and idx<PERIODS_PER_DAY:
         torem=[]
         for sess in list(day_sessions):
-            bs=sess.get('block_size',1)
+            bs=sess.block_size
             if idx+bs-1>=PERIODS_PER_DAY: continue
-            ok=True
-            for off in range(bs):
-                for other in placed.get((day,idx),[]):
-                    if set(sess['students'])&set(other['students']):
-                        ok=False; break
-                if not ok: break
+            ok=not (sess.student_conflicts & placed[idx]) and is_candidate(sess,day,idx)
             if ok:
                 for off in range(bs):
-                    placed.setdefault((day,idx+off),[]).append(sess)
+                    placed[idx+off]|=1<<sess.index
+                starts.append((sess,(day,idx)))
                 torem.append(sess)
         if torem:
-            idx+=max(s.get('block_size',1) for s in torem)
+            idx+=max(s.block_size for s in torem)
             for s in torem:
                 day_sessions.remove(s)
         else:
             idx+=1
 
-    for slot,sl in placed.items():
-        schedule[slot]=sl
+    for sess,start in starts:
+        schedule.place(sess,start)
 
     if day_sessions:
         orig_map=defaultdict(list)
         for p,sess in original:
-            orig_map[sess['id']].append(p)
+            orig_map[sess.index].append(p)
         for sess in day_sessions:
-            bs=sess.get('block_size',1)
-            for start in orig_map[sess['id']]:
-                if start+bs-1<PERIODS_PER_DAY:
+            bs=sess.block_size
+            for start in orig_map[sess.index]:
+                if start+bs-1<PERIODS_PER_DAY and is_candidate(sess,day,start):
                     ok=True
                     for off in range(bs):
                         if has_student_conflict(sess,(day,start+off),schedule):
                             ok=False; break
                     if ok:
-                        for off in range(bs):
-                            schedule.setdefault((day,start+off),[]).append(sess)
+                        schedule.place(sess,(day,start))
                         break
             else:
-                for off in range(bs):
-                    schedule.setdefault((day,orig_map[sess['id']][0]+off),[]).append(sess)
+                schedule.place(sess,old_starts[sess.index])
+
+    if moves is not None:
+        for sess in moved:
+            moves.append((sess,old_starts[sess.index],schedule.start_of(sess)))
 
     return schedule
 
 # --- Output & Validation ---
-def format_schedule_output(schedule, subjects, teachers, students_dict):
+def format_schedule_output(schedule, subjects, teachers, students_dict, student_groups=None):
     """
     Format the schedule for output with proper parallel class identification.
+    Each lesson keeps the id, subject and group of its session; teachers and
+    students are expanded to {'id', 'name'} records.
+    With `student_groups`, each cohort representative is expanded to its members.
     """
+    members = cohort_members(student_groups) if student_groups else {}
     subject_dict = {
         s[0]: {'id': s[0], 'name': s[1], 'group_count': s[2]}
         for s in subjects.values()
@@ -1349,10 +2875,10 @@ def format_schedule_output(schedule, subjects, teachers, students_dict):
 
         for sess in slot_sessions:
             # Skip sessions with no students
-            if not sess['students']:
+            if not sess.students:
                 continue
                 
-            sid = sess['subject']
+            sid = sess.subject
             subj = subject_dict[sid]
 
             # Determine if this is from a parallel subject
@@ -1360,20 +2886,21 @@ def format_schedule_output(schedule, subjects, teachers, students_dict):
 
             teachers_out = [
                 {'id': tid, 'name': teacher_dict[tid]['name']}
-                for tid in sess['teachers'] if tid is not None
+                for tid in sess.teachers if tid is not None
             ]
             students_out = [
                 {'id': st, 'name': students_dict[st]['name']}
-                for st in sess['students']
+                for rep in sess.students
+                for st in members.get(rep, [rep])
             ]
 
             formatted_session = {
-                'id': sess['id'],
+                'id': sess.id,
                 'subject_id': sid,
                 'subject_name': subj['name'],
                 'teachers': teachers_out,
                 'students': students_out,
-                'group': sess.get('group', 1),
+                'group': sess.group,
                 'is_parallel': is_parallel
             }
             formatted['days'][day_str][per_str].append(formatted_session)
@@ -1415,7 +2942,7 @@ def validate_final_schedule(schedule, sessions, subjects, teachers):
         
         # First pass: collect all data for this slot
         for sess in slot_sessions:
-            sid = sess['subject']
+            sid = sess.subject
             
             # Add this timeslot to the subject's set
             subject_slots[sid].add((day, period))
@@ -1424,12 +2951,12 @@ def validate_final_schedule(schedule, sessions, subjects, teachers):
             stats['subject_daily'][sid][day] += 1
             
             # Track teachers and students for conflict detection
-            for tid in sess['teachers']:
-                teachers_this_slot[tid].append(sess['id'])
+            for tid in sess.teachers:
+                teachers_this_slot[tid].append(sess.id)
                 stats['teacher_daily_load'][tid][day] += 1
                 
-            for stu in sess['students']:
-                students_this_slot[stu].append(sess['id'])
+            for stu in sess.students:
+                students_this_slot[stu].append(sess.id)
                 stats['student_daily_load'][stu][day] += 1
 
         # Check for conflicts
@@ -1456,8 +2983,8 @@ def validate_final_schedule(schedule, sessions, subjects, teachers):
             for (day, period) in subject_slots[sid]:
                 groups_in_slot = set()
                 for sess in schedule.get((day, period), []):
-                    if sess['subject'] == sid:
-                        groups_in_slot.add(sess.get('group', 1))
+                    if sess.subject == sid:
+                        groups_in_slot.add(sess.group)
                 
                 # Count once per actual group present
                 stats['subject_hours'][sid] += len(groups_in_slot)
@@ -1495,7 +3022,7 @@ def validate_final_schedule(schedule, sessions, subjects, teachers):
                 if count_d == minpd:
                     periods = [
                         p for (dd, p), sl in schedule.items()
-                        if dd == d for s in sl if s['subject'] == sid
+                        if dd == d for s in sl if s.subject == sid
                     ]
                     periods.sort()
                     if any(periods[i+1] - periods[i] != 1 for i in range(len(periods)-1)):
@@ -1533,26 +3060,149 @@ def validate_final_schedule(schedule, sessions, subjects, teachers):
     logger.info("\n=== End Detailed Validation ===\n")
     return stats
 
-# --- Main Execution ---
-if __name__ == '__main__':
-    teachers, subjects, students_raw, st_map, subj_students, hour_blocker, student_groups = load_data()
-    sessions = build_sessions(teachers, subjects, st_map, subj_students, hour_blocker)
+# --- Run Metrics ---
+class RunMetrics:
+    """
+    Timers, counters and gauges for one run, written as a single JSON
+    record. Phases are timed with `with metrics.phase(name):`; repeated
+    phases accumulate.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.operators = {}  # merged OperatorSelector summary of the search
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def gauge(self, name, value):
+        # JSON has no infinity: an infinite score (hard clashes left) is stored as null
+        if isinstance(value, float) and math.isinf(value):
+            value = None
+        self.gauges[name] = value
+
+    def as_dict(self):
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'total_time': time.time() - self.started,
+            'phases': dict(self.phases),
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'operators': self.operators,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+def metrics_path(output_path):
+    """Metrics file written next to a schedule output: schedule_output.json -> schedule_output_metrics.json"""
+    return os.path.splitext(output_path)[0] + '_metrics.json'
+
+
+def write_schedule(formatted, path, output_format='json'):
+    """
+    Write a format_schedule_output result to `path` as 'json' (the layout
+    the GUI reads back) or 'csv' (one row per session).
+    """
+    if output_format == 'json':
+        with open(path, 'w') as f:
+            json.dump(formatted, f, indent=2)
+    elif output_format == 'csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['day', 'period', 'subject_id', 'subject_name', 'group', 'is_parallel',
+                             'teacher_ids', 'teachers', 'student_ids'])
+            for day, periods in sorted(formatted['days'].items(), key=lambda kv: int(kv[0])):
+                for period, sessions in sorted(periods.items(), key=lambda kv: int(kv[0])):
+                    for sess in sessions:
+                        writer.writerow([
+                            DAYS[int(day)], period, sess['subject_id'], sess['subject_name'],
+                            sess['group'], int(sess['is_parallel']),
+                            ";".join(str(t['id']) for t in sess['teachers']),
+                            ";".join(t['name'] for t in sess['teachers']),
+                            ";".join(str(st['id']) for st in sess['students'])
+                        ])
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
 
-    schedule, students_dict = solve_timetable(sessions, subjects, teachers, hour_blocker, time_limit=1200)
 
-    if schedule:
-        formatted = format_schedule_output(schedule, subjects, teachers, students_dict)
-        stats = validate_final_schedule(schedule, sessions, subjects, teachers)
+def run_pipeline(output_path='schedule_output.json', time_limit=1200, stop_flag=None,
+                 workers=1, engine="sa", stats=None, output_format='json', warm_start=None,
+                 repair=False, checkpoint=None, resume=False):
+    """
+    Load data, solve, validate and write the schedule to `output_path`
+    (see write_schedule for `output_format`), timing every phase.
+    `warm_start` is the path of a saved JSON schedule to start from; it is
+    read before `output_path` is overwritten, so both may be the same file.
+    With `repair`, that schedule is repaired with as few moves as possible
+    (see solve_timetable). `checkpoint` and `resume` are passed on to
+    solve_timetable. The metrics record is written next to the output
+    (see metrics_path) and returned with the formatted schedule and the
+    validation stats: (formatted, validation_stats, metrics dict).
+    Nothing but the metrics is written when no schedule is found or the
+    run is stopped; formatted and validation_stats are then None.
+    """
+    metrics = RunMetrics()
+    formatted = validation_stats = None
+    try:
+        with metrics.phase('load_data'):
+            teachers, subjects, students_raw, st_map, subj_students, hour_blocker, student_groups = load_data()
+        if not teachers or not subjects or not students_raw:
+            raise ValueError("Missing required data")
+        metrics.gauge('teachers', len(teachers))
+        metrics.gauge('subjects', len(subjects))
+        metrics.gauge('students', len(students_raw))
+
+        with metrics.phase('build_sessions'):
+            sessions = build_sessions(teachers, subjects, st_map, subj_students, hour_blocker, student_groups)
+        if not sessions:
+            raise ValueError("Failed to create valid sessions")
+        initial_schedule = load_saved_schedule(warm_start) if warm_start else None
+        if repair and initial_schedule is None:
+            raise ValueError("Repair mode needs a readable saved schedule")
+
+        schedule, students_dict = solve_timetable(
+            sessions, subjects, teachers, hour_blocker, time_limit=time_limit, stop_flag=stop_flag,
+            student_groups=student_groups, workers=workers, stats=stats, engine=engine, metrics=metrics,
+            initial_schedule=initial_schedule, repair=repair, checkpoint=checkpoint, resume=resume
+        )
+        if schedule and not (stop_flag and stop_flag()):
+            with metrics.phase('format_schedule_output'):
+                formatted = format_schedule_output(schedule, subjects, teachers, students_dict, student_groups)
+            with metrics.phase('validate_final_schedule'):
+                validation_stats = validate_final_schedule(schedule, sessions, subjects, teachers)
+            metrics.gauge('teacher_conflicts', validation_stats['teacher_conflicts'])
+            metrics.gauge('student_conflicts', validation_stats['student_conflicts'])
+
+            with metrics.phase('write_output'):
+                write_schedule(formatted, output_path, output_format)
+    finally:
+        metrics.write(metrics_path(output_path))
+    return formatted, validation_stats, metrics.as_dict()
 
+# --- Main Execution ---
+if __name__ == '__main__':
+    formatted, stats, metrics = run_pipeline('schedule_output.json', time_limit=1200)
+
+    if formatted:
         logger.info("\nSchedule Summary:")
         logger.info(f"Total sessions scheduled: {formatted['metadata']['total_sessions']}")
         logger.info(f"Days: {formatted['metadata']['num_days']}")
         logger.info(f"Periods per day: {formatted['metadata']['periods_per_day']}")
-
-        with open('schedule_output.json', 'w') as f:
-            json.dump(formatted, f, indent=2)
-
         logger.info("\nDetailed schedule saved to 'schedule_output.json'")
+        logger.info(f"Run metrics saved to '{metrics_path('schedule_output.json')}'")
     else:
         logger.error("No solution found")
         exit(1)
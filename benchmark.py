@@ -0,0 +1,151 @@
+"""
+Solver benchmark.
+
+Generates synthetic schools (see generate_data.py) at a few sizes and seeds,
+solves each one in a fresh process and writes one JSON report with, per
+case: iterations per second, time to the first clash-free timetable, final
+score and peak memory.
+
+    python benchmark.py --sizes small medium --seeds 0 1 2 --time-limit 60 --output bench.json
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SIZES = {
+    # name: (students, subjects, teachers)
+    'small':  (90, 20, 26),
+    'medium': (300, 40, 50),
+    'large':  (1000, 80, 100),
+}
+HAVE_RESOURCE = importlib.util.find_spec('resource') is not None  # Unix only
+
+
+def _peak_memory_mb():
+    # Peak resident set size of this process; tracemalloc (Python heap only) where resource is missing
+    if not HAVE_RESOURCE:
+        import tracemalloc
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20, 'tracemalloc'
+    import resource
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 'ru_maxrss'
+
+
+def _finite(score):
+    return None if score is None or math.isinf(score) else score
+
+
+def run_case(size, seed, time_limit, engine, workers, db_dir, log_level):
+    """
+    Generate one school and solve it, returning the case's metrics.
+    Meant to run in its own process so peak memory is per case.
+    """
+    if not HAVE_RESOURCE:
+        import tracemalloc
+        tracemalloc.start()
+
+    from generate_data import generate_school
+    from algorithm import load_data, build_sessions, solve_timetable
+    logging.getLogger().setLevel(log_level)  # after algorithm's basicConfig
+
+    students, subjects_n, teachers_n = SIZES[size]
+    path = os.path.join(db_dir, f"{size}_{seed}.db")
+    summary = generate_school(path, n_students=students, n_subjects=subjects_n,
+                              n_teachers=teachers_n, seed=seed, overwrite=True)
+
+    teachers, subjects, students_raw, st_map, stud_map, hb, student_groups = load_data()
+    sessions = build_sessions(teachers, subjects, st_map, stud_map, hb, student_groups)
+
+    stats = {}
+    start = time.time()
+    solve_timetable(sessions, subjects, teachers, hb, time_limit=time_limit,
+                    student_groups=student_groups, workers=workers, stats=stats, engine=engine)
+    elapsed = time.time() - start
+    peak_mb, memory_source = _peak_memory_mb()
+
+    case = {
+        'size': size,
+        'seed': seed,
+        'engine': engine,
+        'workers': workers,
+        'instance': summary,
+        'sessions': len(sessions),
+        'session_hours': sum(sess.block_size for sess in sessions),
+        'feasible': stats.get('feasibility', {}).get('feasible'),
+        'elapsed': elapsed,
+        'peak_memory_mb': peak_mb,
+        'memory_source': memory_source,
+    }
+    if 'trace' not in stats:
+        # Proven infeasible: the search never ran
+        return case
+
+    setup_time = stats['trace'][0][0]
+    iterations = sum(w['iterations'] for w in stats['workers'])
+    search_time = max(elapsed - setup_time, 1e-9)
+    first_clash_free = next((t for t, score in stats['trace'] if not math.isinf(score)), None)
+    case.update({
+        'setup_time': setup_time,
+        'iterations': iterations,
+        'iterations_per_sec': iterations / search_time,
+        'time_to_first_conflict_free': first_clash_free,
+        'initial_score': _finite(stats['initial_score']),
+        'final_score': _finite(stats['best_score']),
+    })
+    return case
+
+
+def run_benchmark(sizes, seeds, time_limit, engine="sa", workers=1, db_dir=None, log_level=logging.WARNING):
+    """Run every size × seed case, each in a fresh process. Returns the report dict."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = []
+        for size in sizes:
+            for seed in seeds:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    case = pool.submit(run_case, size, seed, time_limit, engine, workers,
+                                       db_dir or tmp, log_level).result()
+                print(f"{size} seed={seed}: final_score={case.get('final_score')}, "
+                      f"it/s={case.get('iterations_per_sec', 0):.0f}, "
+                      f"first clash-free={case.get('time_to_first_conflict_free')}, "
+                      f"peak={case['peak_memory_mb']:.1f} MB", file=sys.stderr)
+                cases.append(case)
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time_limit': time_limit,
+        'engine': engine,
+        'workers': workers,
+        'cases': cases,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the solver on synthetic schools.")
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["small", "medium"])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--time-limit", type=float, default=60)
+    parser.add_argument("--engine", default="sa")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--db-dir", help="Keep the generated databases here (default: a temporary directory)")
+    parser.add_argument("--output", help="JSON report file (default: stdout)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.seeds, args.time_limit, engine=args.engine,
+                           workers=args.workers, db_dir=args.db_dir, log_level=args.log_level.upper())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,70 @@
+"""
+Cold-start benchmark for the GUI module.
+
+Imports gui.py in fresh interpreters and reports the median import time
+against the old cold start, which did the now-deferred work up front and
+in that order (importing pandas and algorithm, opening the SQLite
+connection, then gui). Also lists the slowest modules from
+`python -X importtime`.
+
+    python benchmark_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = {
+    # Old cold start: pandas, algorithm and the connection were paid before the window opened
+    'eager (old cold start)': (
+        "import importlib.util\n"
+        "if importlib.util.find_spec('pandas'): import pandas\n"
+        "import algorithm, data\n"
+        "data.get_connection()\n"
+        "import gui"
+    ),
+    'lazy': "import gui",
+}
+
+
+def _time_import(code):
+    # Time `code` in a fresh interpreter so nothing is cached in sys.modules
+    script = f"import time\nt = time.perf_counter()\n{code}\nprint(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module="gui", top=10):
+    """(cumulative µs, module) of the `top` slowest imports under `module`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=HERE, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(runs):
+    report = {'python': sys.version.split()[0], 'runs': runs, 'cases': {}}
+    for name, code in CASES.items():
+        times = [_time_import(code) for _ in range(runs)]
+        report['cases'][name] = {'median_ms': 1000 * statistics.median(times),
+                                 'min_ms': 1000 * min(times)}
+    report['saved_ms'] = (report['cases']['eager (old cold start)']['median_ms']
+                          - report['cases']['lazy']['median_ms'])
+    report['slowest_imports_us'] = slowest_imports()
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the GUI's cold import time.")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs), indent=2))
@@ -0,0 +1,96 @@
+"""
+Headless solver entry point for batch runs (no Tk, no pandas).
+
+    python cli.py --db data.db --time-limit 600 --seed 1 --engine sa --workers 4 \
+        --output schedule_output.json --format json --log-level WARNING
+
+Exit status:
+    0  a clash-free timetable was found and written
+    1  error (bad input, missing data, ...)
+    3  infeasible: the feasibility analysis proved no clash-free timetable exists
+    4  timed out (or stopped) before reaching a clash-free timetable; the best
+       schedule found is still written unless the run was stopped
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import sys
+
+EXIT_FEASIBLE = 0
+EXIT_ERROR = 1
+EXIT_INFEASIBLE = 3
+EXIT_TIMEOUT = 4
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the school timetable without the GUI.")
+    parser.add_argument("--db", help="SQLite database (default: $TIMETABLE_DB, else data.db)")
+    parser.add_argument("--time-limit", type=float, default=1200, help="Seconds for the whole solve")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible run")
+    parser.add_argument("--engine", choices=["sa", "pt", "tabu", "lns"], default="sa")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel chains / tempering replicas")
+    parser.add_argument("--output", default="schedule_output.json")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--warm-start", metavar="JSON", help="Start from a saved JSON schedule")
+    parser.add_argument("--repair", action="store_true",
+                        help="With --warm-start: move as few lessons of the saved schedule as possible")
+    parser.add_argument("--checkpoint", metavar="FILE", help="Save solver state here periodically")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    parser.add_argument("--log-level", default="INFO",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], type=str.upper)
+    args = parser.parse_args(argv)
+    if args.repair and not args.warm_start:
+        parser.error("--repair needs --warm-start")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+
+    import data
+    from algorithm import run_pipeline, metrics_path, logger
+    logging.getLogger().setLevel(args.log_level)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # SIGINT/SIGTERM stop the search at its next check instead of killing the run
+    stopped = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopped.append(True))
+
+    if args.db and not os.path.exists(args.db):
+        # sqlite3 would silently create an empty database here
+        logger.error(f"Database not found: {args.db}")
+        return EXIT_ERROR
+
+    stats = {}
+    try:
+        if args.db:
+            data.use_database(args.db)
+        formatted, validation, metrics = run_pipeline(
+            args.output, time_limit=args.time_limit, stop_flag=lambda: bool(stopped),
+            workers=max(1, args.workers), engine=args.engine, stats=stats, output_format=args.format,
+            warm_start=args.warm_start, repair=args.repair, checkpoint=args.checkpoint, resume=args.resume
+        )
+    except Exception:
+        logger.exception("Solver failed")
+        return EXIT_ERROR
+
+    if not stats.get('feasibility', {}).get('feasible', True):
+        for problem in stats['feasibility']['problems']:
+            logger.error(problem)
+        return EXIT_INFEASIBLE
+    if formatted is None:
+        logger.error("Stopped before a schedule was written")
+        return EXIT_TIMEOUT
+
+    logger.info(f"Schedule written to {args.output}, metrics to {metrics_path(args.output)}")
+    if validation['teacher_conflicts'] or validation['student_conflicts']:
+        logger.error(f"Time limit reached with {validation['teacher_conflicts']} teacher and "
+                     f"{validation['student_conflicts']} student conflicts left")
+        return EXIT_TIMEOUT
+    return EXIT_FEASIBLE
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,31 @@
+import os
 import sqlite3
 
-conn = sqlite3.connect("data.db", check_same_thread=False)
+# Database file, overridable with the TIMETABLE_DB environment variable or use_database().
+# The connection is opened on first use, not at import.
+DB_PATH = os.environ.get("TIMETABLE_DB", "data.db")
+_conn = None
+
+
+def get_connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    return _conn
+
+
+# Switch every query below to another database file (created if missing)
+def use_database(path):
+    global DB_PATH, _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+    DB_PATH = path
 
 
 #CREATING
 def teacher_table_creator():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         # "DROP TABLE teacher"
         """
@@ -29,11 +49,11 @@ def teacher_table_creator():
         )
         """
     )
-    conn.commit()
+    get_connection().commit()
 # teacher_table_creator()
 
 def subject_table_creator():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         # "DROP TABLE subject"
         """
@@ -49,11 +69,11 @@ def subject_table_creator():
         )
         """
     )
-    conn.commit()
+    get_connection().commit()
 # subject_table_creator()
 
 def student_table_creator():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         # "DROP TABLE student"
         """
@@ -65,11 +85,11 @@ def student_table_creator():
         )
         """
     )
-    conn.commit()
+    get_connection().commit()
 # student_table_creator()
 
 def subject_teacher_table_creator():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         # "DROP TABLE subject_teacher"
         """
@@ -83,11 +103,11 @@ def subject_teacher_table_creator():
         )
         """
     )
-    conn.commit()
+    get_connection().commit()
 # subject_teacher_table_creator()
 
 def subject_student_table_creator():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         # "DROP TABLE subject_student"
         """
@@ -100,11 +120,11 @@ def subject_student_table_creator():
         """
         # FOREIGN KEY (json_subject_ids) REFERENCES subject(id),
     )
-    conn.commit()
+    get_connection().commit()
 # subject_student_table_creator()
 
 def hour_blocker_table_creator():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         # "DROP TABLE hour_blocker"
         """
@@ -152,7 +172,7 @@ def hour_blocker_table_creator():
         )
         """
     )
-    conn.commit()
+    get_connection().commit()
 # hour_blocker_table_creator()
 
 # teacher_table_creator()
@@ -165,90 +185,90 @@ def hour_blocker_table_creator():
 
 # ADD
 def add_teacher(name, middle_name, last_name, monday, tuesday, wednesday, thursday, monday1, tuesday1, wednesday1, thursday1, monday2, tuesday2, wednesday2, thursday2):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         INSERT INTO teacher(name, middle_name, last_name, monday, tuesday, wednesday, thursday, monday1, tuesday1, wednesday1, thursday1, monday2, tuesday2, wednesday2, thursday2) VALUES("{name}", "{middle_name}", "{last_name}", "{monday}", "{tuesday}", "{wednesday}", "{thursday}", "{monday1}", "{tuesday1}", "{wednesday1}", "{thursday1}", "{monday2}", "{tuesday2}", "{wednesday2}", "{thursday2}")
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def add_subject(name, group_number, number_of_hours_per_week, max_hours_per_day, max_student_count_per_group, min_hours_per_day, parallel_subject_groups):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         INSERT INTO subject(name, group_number, number_of_hours_per_week, max_hours_per_day, max_student_count_per_group, min_hours_per_day, parallel_subject_groups) VALUES("{name}", "{group_number}", "{number_of_hours_per_week}", "{max_hours_per_day}", "{max_student_count_per_group}", "{min_hours_per_day}", "{parallel_subject_groups}")
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def add_student(name, middle_name, last_name):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         INSERT INTO student(name, middle_name, last_name) VALUES("{name}", "{middle_name}", "{last_name}")
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def add_subject_teacher(subject_id, teacher_id, group_number):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         INSERT INTO subject_teacher(subject_id, teacher_id, group_number) VALUES("{subject_id}","{teacher_id}","{group_number}")
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def add_subject_student(json_subject_ids, student_id):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         INSERT INTO subject_student(json_subject_ids, student_id) VALUES("{json_subject_ids}","{student_id}")
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 
 #GET
 def get_teacher():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         SELECT id, name, middle_name, last_name, monday, tuesday, wednesday, thursday, monday1, tuesday1, wednesday1, thursday1, monday2, tuesday2, wednesday2, thursday2 FROM teacher
         ORDER BY last_name ASC
         """
     )
-    conn.commit()
+    get_connection().commit()
     data = cur.fetchall()
     return data
 
 def get_subject():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         SELECT id, name, group_number, number_of_hours_per_week, max_hours_per_day, max_student_count_per_group, min_hours_per_day, parallel_subject_groups FROM subject
         ORDER BY name ASC
         """
     )
-    conn.commit()
+    get_connection().commit()
     data = cur.fetchall()
     return data
 
 def get_student():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         SELECT id, name, middle_name, last_name FROM student
         ORDER BY last_name ASC
         """
     )
-    conn.commit()
+    get_connection().commit()
     data = cur.fetchall()
     return data
 
 def get_subject_teacher():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         SELECT subject_teacher.id, subject.id AS subject_id, subject.name AS subject_name,
@@ -258,12 +278,12 @@ def get_subject_teacher():
         LEFT JOIN teacher ON teacher.id = subject_teacher.teacher_id
         """
     )
-    conn.commit()
+    get_connection().commit()
     data = cur.fetchall()
     return data
 
 def get_subject_student():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         SELECT subject_student.id, subject_student.json_subject_ids AS json_subject_ids, subject.name AS subject_name, student.id AS student_id, 
@@ -273,7 +293,7 @@ def get_subject_student():
         LEFT JOIN student ON student.id = subject_student.student_id
         """
     )
-    conn.commit()
+    get_connection().commit()
     data = cur.fetchall()
     return data
 
@@ -281,63 +301,63 @@ def get_subject_student():
 #REMOVE
 def remove_teacher(id):
     for i in range(len(id)):
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute(
             f"""
             DELETE FROM teacher
             WHERE id = "{id[i]}"
             """
         )
-        conn.commit()
+        get_connection().commit()
 
 def remove_subject(id):
     for i in range(len(id)):
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute(
             f"""
             DELETE FROM subject
             WHERE id = "{id[i]}"
             """
         )
-        conn.commit()
+        get_connection().commit()
 
 def remove_student(id):
     for i in range(len(id)):
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute(
             f"""
             DELETE FROM student
             WHERE id = "{id[i]}"
             """
         )
-        conn.commit()
+        get_connection().commit()
 
 def remove_subject_teacher(id):
     for i in range(len(id)):
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute(
             f"""
             DELETE FROM subject_teacher
             WHERE id = "{id[i]}"
             """
         )
-        conn.commit()
+        get_connection().commit()
 
 def remove_subject_student(id):
     for i in range(len(id)):
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute(
             f"""
             DELETE FROM subject_student
             WHERE id = "{id[i]}"
             """
         )
-        conn.commit()
+        get_connection().commit()
 
 
 #UPDATE
 def update_teacher(id, name, middle_name, last_name, monday, tuesday, wednesday, thursday, monday1, tuesday1, wednesday1, thursday1, monday2, tuesday2, wednesday2, thursday2):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         UPDATE teacher
@@ -345,10 +365,10 @@ def update_teacher(id, name, middle_name, last_name, monday, tuesday, wednesday,
         WHERE id = {id};
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def update_subject(id, name, group_number, number_of_hours_per_week, max_hours_per_day, max_student_count_per_group, min_hours_per_day, parallel_subject_groups):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         UPDATE subject
@@ -356,10 +376,10 @@ def update_subject(id, name, group_number, number_of_hours_per_week, max_hours_p
         WHERE id = {id};
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def update_student(id, name, middle_name, last_name):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         UPDATE student
@@ -367,10 +387,10 @@ def update_student(id, name, middle_name, last_name):
         WHERE id = {id};
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def update_subject_teacher(id, subject_id, teacher_id, group_number):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         UPDATE subject_teacher
@@ -378,10 +398,10 @@ def update_subject_teacher(id, subject_id, teacher_id, group_number):
         WHERE id = {id};
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def update_subject_student(id, json_subject_ids, student_id):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         UPDATE subject_student
@@ -389,11 +409,11 @@ def update_subject_student(id, json_subject_ids, student_id):
         WHERE id = {id};
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 #HOUR BLOCKER
 def hour_blocker_save(monday1, monday2, monday3, monday4, monday5, monday6, monday7, monday8, monday9, monday10, tuesday1, tuesday2, tuesday3, tuesday4, tuesday5, tuesday6, tuesday7, tuesday8, tuesday9, tuesday10, wednesday1, wednesday2, wednesday3, wednesday4, wednesday5, wednesday6, wednesday7, wednesday8, wednesday9, wednesday10, thursday1, thursday2, thursday3, thursday4, thursday5, thursday6, thursday7, thursday8, thursday9, thursday10):
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         UPDATE hour_blocker
@@ -407,10 +427,10 @@ def hour_blocker_save(monday1, monday2, monday3, monday4, monday5, monday6, mond
             thursday6 = "{thursday6}", thursday7 = "{thursday7}", thursday8 = "{thursday8}", thursday9 = "{thursday9}", thursday10 = "{thursday10}"
         """
     )
-    conn.commit()
+    get_connection().commit()
 
 def get_hour_blocker():
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute(
         f"""
         SELECT monday1, monday2, monday3, monday4, monday5, monday6, monday7, monday8, monday9, monday10,
@@ -421,6 +441,6 @@ def get_hour_blocker():
         FROM hour_blocker
         """
     )
-    conn.commit()
+    get_connection().commit()
     data = cur.fetchall()
     return data
\ No newline at end of file
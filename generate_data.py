@@ -0,0 +1,167 @@
+"""
+Synthetic school generator.
+
+Writes a randomly generated school (teachers, subjects, students, their
+assignments and the hour blocker) into a fresh SQLite file with the tables
+data.py expects, so the solver can be run and benchmarked on instances of
+any size.
+
+    python generate_data.py synthetic.db --students 300 --subjects 40 --teachers 50
+"""
+import argparse
+import json
+import math
+import os
+import random
+
+import data
+
+PERIODS_PER_DAY = 10
+DAYS = 4
+TRACK_SIZE = 25   # Students per track (class sharing a subject set)
+GROUP_SIZE = 30   # Students per subject group
+
+
+def _teacher_row(rng, tid, availability):
+    # Each day is worked with probability `availability`; partial days get a shorter window
+    days = [rng.random() < availability for _ in range(DAYS)]
+    if not any(days):
+        days[rng.randrange(DAYS)] = True
+    starts, ends = [], []
+    for _ in range(DAYS):
+        if rng.random() < availability:
+            starts.append(1)
+            ends.append(PERIODS_PER_DAY)
+        else:
+            starts.append(rng.randint(1, 3))
+            ends.append(rng.randint(PERIODS_PER_DAY - 2, PERIODS_PER_DAY))
+    return (tid, "Teacher", "", f"T{tid}", *map(int, days), *starts, *ends)
+
+
+def _teacher_slots(row):
+    return sum(end - start + 1 for day, start, end in zip(row[4:8], row[8:12], row[12:16]) if day)
+
+
+def generate_school(path, n_students=90, n_subjects=20, n_teachers=26, max_groups=4,
+                    parallel_share=0.2, availability=1.0, elective_share=0.2, seed=0, overwrite=False):
+    """
+    Generate a school into a new SQLite file at `path` and return a summary
+    of its size. Students are split into tracks of TRACK_SIZE sharing a
+    subject set; `elective_share` of them swap one subject. Subjects get one
+    group per GROUP_SIZE enrolled students (up to `max_groups`), and
+    `parallel_share` of multi-group subjects run their groups in parallel.
+    `availability` (0..1) is how much of the week teachers work.
+    Leaves data.py connected to `path`.
+    """
+    if os.path.exists(path):
+        if not overwrite:
+            raise FileExistsError(path)
+        os.remove(path)
+    rng = random.Random(seed)
+
+    data.use_database(path)
+    data.teacher_table_creator()
+    data.subject_table_creator()
+    data.student_table_creator()
+    data.subject_teacher_table_creator()
+    data.subject_student_table_creator()
+    data.hour_blocker_table_creator()
+
+    # Students come in tracks (classes) sharing a subject set, with the odd elective swap
+    hours_of = {sid: rng.choice([1, 2, 2, 3, 4, 4, 5, 6]) for sid in range(1, n_subjects + 1)}
+    popularity = {sid: rng.uniform(0.2, 1.0) for sid in hours_of}
+    n_tracks = max(1, round(n_students / TRACK_SIZE))
+    tracks = []
+    for k in range(n_tracks):
+        target = rng.randint(18, 28)
+        order = sorted(hours_of, key=lambda sid: rng.random() ** (1 / popularity[sid]), reverse=True)
+        order.remove(k % n_subjects + 1)
+        order.insert(0, k % n_subjects + 1)  # every subject anchors some track
+        taken, total = [], 0
+        for sid in order:
+            if total + hours_of[sid] <= target:
+                taken.append(sid)
+                total += hours_of[sid]
+        tracks.append(taken)
+
+    students, subject_students = [], []
+    enrolled = {sid: 0 for sid in hours_of}
+    for st in range(1, n_students + 1):
+        taken = list(tracks[(st - 1) * n_tracks // n_students])
+        if rng.random() < elective_share:
+            out = rng.choice(taken)
+            swaps = [sid for sid in hours_of if sid not in taken and hours_of[sid] <= hours_of[out]]
+            if swaps:
+                taken[taken.index(out)] = rng.choice(swaps)
+        for sid in taken:
+            enrolled[sid] += 1
+        students.append((st, "Student", "", f"S{st}"))
+        subject_students.append((json.dumps(sorted(taken)), st))
+
+    teachers = [_teacher_row(rng, tid, availability) for tid in range(1, n_teachers + 1)]
+    capacity = {row[0]: _teacher_slots(row) for row in teachers}
+    load = {row[0]: 0 for row in teachers}
+
+    subjects, subject_teachers = [], []
+    for sid, hours in hours_of.items():
+        groups = min(max_groups, max(1, math.ceil(enrolled[sid] / GROUP_SIZE)))
+        parallel = groups > 1 and rng.random() < parallel_share
+        maxpd = 1 if hours <= 2 else 2
+        minpd = rng.choice([1, maxpd])
+        max_students = max(GROUP_SIZE, math.ceil(enrolled[sid] / groups))
+        subjects.append((sid, f"Subject {sid}", groups, hours, maxpd, max_students, minpd, int(parallel)))
+
+        # Parallel groups need a teacher each; others share 1..groups teachers
+        n_assigned = groups if parallel else rng.randint(1, groups)
+        shares = [1] * n_assigned
+        for _ in range(groups - n_assigned):
+            shares[rng.randrange(n_assigned)] += 1
+        chosen = set()
+        for share in shares:
+            free = [tid for tid in load if tid not in chosen]
+            tid = min(free, key=lambda t: ((load[t] + hours * share) / capacity[t], rng.random()))
+            chosen.add(tid)
+            load[tid] += hours * share
+            subject_teachers.append((sid, tid, share))
+
+    cur = data.get_connection().cursor()
+    cur.executemany("INSERT INTO teacher VALUES (" + ",".join("?" * 16) + ")", teachers)
+    cur.executemany("INSERT INTO subject VALUES (?,?,?,?,?,?,?,?)", subjects)
+    cur.executemany("INSERT INTO student VALUES (?,?,?,?)", students)
+    cur.executemany("INSERT INTO subject_teacher(subject_id, teacher_id, group_number) VALUES (?,?,?)",
+                    subject_teachers)
+    cur.executemany("INSERT INTO subject_student(json_subject_ids, student_id) VALUES (?,?)", subject_students)
+    cur.execute("INSERT INTO hour_blocker DEFAULT VALUES")
+    data.get_connection().commit()
+
+    return {
+        'path': path,
+        'seed': seed,
+        'teachers': n_teachers,
+        'subjects': n_subjects,
+        'parallel_subjects': sum(s[7] for s in subjects),
+        'students': n_students,
+        'weekly_hours': sum(s[2] * s[3] for s in subjects),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic school database.")
+    parser.add_argument("path", help="SQLite file to create")
+    parser.add_argument("--students", type=int, default=90)
+    parser.add_argument("--subjects", type=int, default=20)
+    parser.add_argument("--teachers", type=int, default=26)
+    parser.add_argument("--max-groups", type=int, default=4)
+    parser.add_argument("--parallel-share", type=float, default=0.2)
+    parser.add_argument("--availability", type=float, default=1.0)
+    parser.add_argument("--elective-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+    summary = generate_school(
+        args.path, n_students=args.students, n_subjects=args.subjects, n_teachers=args.teachers,
+        max_groups=args.max_groups, parallel_share=args.parallel_share,
+        availability=args.availability, elective_share=args.elective_share,
+        seed=args.seed, overwrite=args.overwrite
+    )
+    print(json.dumps(summary, indent=2))
@@ -3,7 +3,7 @@ from tkinter import END, messagebox
 from tkinter.messagebox import showerror
 
 import json
-import pandas as pd
+import os
 import threading
 import logging
 
@@ -980,6 +980,7 @@ class MainGUI:
             
         
         def add_from_ecxel():
+            import pandas as pd  # slow to import and only needed here, so loaded on first use
             file_path = ent1.get()
             try:
                 file = pd.read_excel(file_path)
@@ -1553,8 +1554,22 @@ class MainGUI:
         btn_frame.pack(fill=tk.X, padx=5, pady=5)
         start_btn = tk.Button(btn_frame, text="Start Algorithm", font=("Arial", 12))
         start_btn.pack(fill=tk.X, padx=5, pady=2)
+        resume_btn = tk.Button(btn_frame, text="Resume Interrupted Run", font=("Arial", 12))
+        resume_btn.pack(fill=tk.X, padx=5, pady=2)
         view_btn = tk.Button(btn_frame, text="View Saved Schedule", font=("Arial", 12))
         view_btn.pack(fill=tk.X, padx=5, pady=2)
+        workers_frame = tk.Frame(btn_frame)
+        workers_frame.pack(fill=tk.X, padx=5, pady=2)
+        tk.Label(workers_frame, text="Parallel chains:", font=("Arial", 10)).pack(side=tk.LEFT)
+        workers_var = tk.IntVar(value=1)
+        tk.Spinbox(workers_frame, from_=1, to=os.cpu_count() or 1, textvariable=workers_var,
+                   width=4, font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        warm_start_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(btn_frame, text="Start from saved schedule", variable=warm_start_var,
+                       font=("Arial", 10)).pack(anchor=tk.W, padx=5, pady=2)
+        repair_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(btn_frame, text="Repair saved schedule (move as few lessons as possible)",
+                       variable=repair_var, font=("Arial", 10)).pack(anchor=tk.W, padx=5, pady=2)
 
         filter_frame = tk.LabelFrame(right_frame, text="Filters", font=("Arial", 12, "bold"))
         filter_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -1722,44 +1737,52 @@ class MainGUI:
         algorithm_thread = None
         is_running = False
 
-        def toggle_algorithm():
+        checkpoint_file = 'solver_checkpoint.bin'
+
+        def toggle_algorithm(resume=False):
             nonlocal algorithm_thread, is_running
             if not is_running:
+                try:
+                    workers = max(1, workers_var.get())
+                except tk.TclError:
+                    workers = 1
+                if resume and not os.path.exists(checkpoint_file):
+                    messagebox.showinfo("Resume", "There is no interrupted run to resume.")
+                    return
+                if resume and workers > 1:
+                    # Only single-chain runs write checkpoints
+                    messagebox.showerror("Resume", "An interrupted run can only be resumed with 1 parallel chain.")
+                    return
+                repair = not resume and repair_var.get()
+                warm_start = repair or (not resume and warm_start_var.get())
+                if warm_start and not os.path.exists('schedule_output.json'):
+                    messagebox.showerror(
+                        "Saved schedule",
+                        "There is no saved schedule (schedule_output.json) to "
+                        + ("repair." if repair else "start from.")
+                    )
+                    return
                 is_running = True
                 self.stop_requested = False
                 start_btn.config(text="Stop Algorithm")
+                resume_btn.config(state="disabled")
                 update_timetable_display()
 
                 def run_algorithm():
                     try:
-                        from algorithm import (
-                            load_data, build_sessions, solve_timetable,
-                            format_schedule_output, validate_final_schedule, logger
-                        )
-
-                        logger.info("Loading data...")
-                        teachers, subjects, students_raw, st_map, stud_map, hb, student_groups = load_data()
-                        if not teachers or not subjects or not students_raw:
-                            raise ValueError("Missing required data")
-
-                        logger.info("Building sessions...")
-                        sessions = build_sessions(teachers, subjects, st_map, stud_map, hb)
-                        if not sessions:
-                            raise ValueError("Failed to create valid sessions")
+                        from algorithm import run_pipeline, logger
 
                         logger.info("Starting solver...")
-                        schedule, students_dict = solve_timetable(
-                            sessions, subjects, teachers, hb,
-                            time_limit=1200, stop_flag=lambda: self.stop_requested
+                        run_stats = {}
+                        formatted_schedule, validation_stats, run_metrics = run_pipeline(
+                            'schedule_output.json', time_limit=1200,
+                            stop_flag=lambda: self.stop_requested, workers=workers, stats=run_stats,
+                            warm_start='schedule_output.json' if warm_start else None, repair=repair,
+                            checkpoint=checkpoint_file if workers == 1 else None, resume=resume
                         )
 
-                        if schedule and not self.stop_requested:
-                            logger.info("Schedule found, validating...")
-                            formatted_schedule = format_schedule_output(schedule, subjects, teachers, students_dict)
-                            validation_stats = validate_final_schedule(schedule, sessions, subjects, teachers)
-
-                            with open('schedule_output.json', 'w') as f:
-                                json.dump(formatted_schedule, f, indent=2)
+                        if formatted_schedule:
+                            logger.info(f"Schedule found in {run_metrics['total_time']:.1f}s")
 
                             # Build the three sets for filters
                             subjects_set = set()
@@ -1780,19 +1803,22 @@ class MainGUI:
 
                             wind.after(0, repopulate_listbox)
                             wind.after(0, lambda: update_timetable_display(formatted_schedule))
-                            wind.after(0, lambda: display_validation_results(validation_stats))
+                            wind.after(0, lambda: display_validation_results(validation_stats, run_metrics['operators']))
                             wind.after(0, lambda: messagebox.showinfo(
                                 "Success",
                                 f"Schedule generated with {formatted_schedule['metadata']['total_sessions']} sessions"
                             ))
                         elif self.stop_requested:
                             logger.info("Algorithm stopped by user")
+                        elif not run_stats.get('feasibility', {}).get('feasible', True):
+                            problems = run_stats['feasibility']['problems']
+                            raise ValueError("No clash-free timetable is possible:\n" + "\n".join(problems[:10]))
                         else:
                             raise ValueError("Could not find valid schedule")
 
                     except Exception as e:
                         if not self.stop_requested:
-                            wind.after(0, lambda: messagebox.showerror("Error", str(e)))
+                            wind.after(0, lambda msg=str(e): messagebox.showerror("Error", msg))
                             logger.exception("Algorithm error")
                     finally:
                         wind.after(0, stop_algorithm)
@@ -1810,8 +1836,9 @@ class MainGUI:
             is_running = False
             algorithm_thread = None
             start_btn.config(text="Start Algorithm", state="normal")
+            resume_btn.config(state="normal")
 
-        def display_validation_results(stats):
+        def display_validation_results(stats, operators=None):
             # Map subject IDs to names
             subj_list = get_subject()
             subj_map = { rec[0]: rec[1] for rec in subj_list }
@@ -1851,10 +1878,19 @@ class MainGUI:
                 for day, count in loads.items():
                     validation_text.insert(tk.END, f"  Day {day+1}: {count}\n")
 
+            if operators:
+                validation_text.insert(tk.END, "\nMove Operators:\n")
+                for name, op in sorted(operators.items()):
+                    validation_text.insert(tk.END, f"- {name}: {op['proposed']} proposed, "
+                                                   f"{op['conflict']} teacher clashes, {op['noop']} no-ops, "
+                                                   f"{op['accepted']} accepted, {op['improved']} improving, "
+                                                   f"{op['mean_us']:.0f} µs mean\n")
+
             validation_text.config(state='disabled')
 
         # Bind buttons after defining functions
         start_btn.configure(command=toggle_algorithm)
+        resume_btn.configure(command=lambda: toggle_algorithm(resume=True))
         view_btn.configure(command=lambda: display_schedule())
 
         # Initialize empty display
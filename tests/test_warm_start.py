@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+import algorithm
+import data
+from generate_data import generate_school
+
+
+@pytest.fixture
+def school(tmp_path):
+    previous = data.DB_PATH
+    generate_school(str(tmp_path / 'school.db'), availability=0.6, seed=3)
+    yield tmp_path
+    data.use_database(previous)
+
+
+def test_warm_start_round_trip_keeps_score(school):
+    random.seed(2)
+    saved = str(school / 'saved.json')
+    cold = {}
+    algorithm.run_pipeline(saved, time_limit=5, stats=cold)
+
+    warm = {}
+    _, _, metrics = algorithm.run_pipeline(str(school / 'warm.json'), time_limit=5, stats=warm, warm_start=saved)
+    assert metrics['gauges']['warm_start_dropped'] == 0
+    # Only lower if greedy_initial fits in a lesson the saved run had left out
+    assert warm['initial_score'] <= cold['best_score']
+    assert warm['best_score'] <= cold['best_score']
+
+
+def test_repair_of_unchanged_data_moves_nothing(school):
+    random.seed(2)
+    saved = str(school / 'saved.json')
+    cold = {}
+    algorithm.run_pipeline(saved, time_limit=5, stats=cold)
+
+    repaired = {}
+    _, _, metrics = algorithm.run_pipeline(str(school / 'repaired.json'), time_limit=5, stats=repaired,
+                                           warm_start=saved, repair=True)
+    assert metrics['gauges']['warm_start_changed'] == 0
+    assert metrics['gauges']['repair_moved'] == 0
+    assert repaired['best_score'] <= cold['best_score']